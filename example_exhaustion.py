@@ -5,11 +5,14 @@ from mmsimu.all import *
 
 def main():
     # The default heap size for this simulator is 1024 bytes.
-    # There's a caveat, though: the simulator will keep track of how much
-    # memory was allocated, but will not actually allocate memory from a heap
-    # and will use the system heap instead. This means that we can always make
-    # use of the full 1024 bytes because there is no possibility for memory
-    # fragmentation.
+    # Blocks are placed inside those 1024 bytes by an allocator. The default
+    # one (first-fit) reuses the lowest free block that is large enough, so
+    # freed memory can be handed out again and small holes between blocks
+    # (fragmentation) may keep a large request from succeeding even when
+    # the total free memory would be enough.
+    #
+    # Other placement policies can be selected with
+    # `mmsimu_init(main, policy=...)`: "best-fit", "segregated-fit" or "buddy".
 
     # Trying to allocate more memory than what we have available will fail
     allocation = malloc(2000)
@@ -47,7 +50,8 @@ def main():
     printf("Freeing int32_t at %p\n", some_int)
     free(some_int)
 
-    # ...we should now be able to malloc up to 4 bytes more!
+    # ...we should now be able to malloc up to 4 bytes more! The allocator
+    # will reuse the space of the int we just freed.
     two_bytes = malloc(2)
     printf("malloc(2) returned: %p\n", two_bytes)
     assert two_bytes != NULL
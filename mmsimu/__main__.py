@@ -0,0 +1,140 @@
+import argparse
+import json
+
+from mmsimu.memory_manager import ALLOCATION_POLICIES, CHECK_LEVELS
+
+
+def replay_command(args):
+    from mmsimu.replay import print_report, replay_trace
+
+    results = replay_trace(args.trace, args.policy, args.heap_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+def bench_command(args):
+    from mmsimu import bench
+
+    baseline = bench.load(args.baseline) if args.baseline else None
+    report = bench.run(args.workload, args.seed)
+    bench.print_report(report, baseline)
+    if args.output:
+        bench.save(report, args.output)
+
+
+def inspect_command(args):
+    from mmsimu.heap_image import HeapImage, print_inspection
+
+    print_inspection(HeapImage(args.heap_file), args.address, args.length)
+
+
+def batch_command(args):
+    from mmsimu import batch
+
+    jobs = batch.load_jobs(args.jobs) if args.jobs else []
+    for script in args.scripts:
+        jobs.append(
+            {
+                "script": script,
+                "heap_size": args.heap_size,
+                "seed": args.seed,
+                "policy": args.policy,
+                "checks": args.checks,
+                "timeout": args.timeout,
+            }
+        )
+
+    records = []
+    output = open(args.output, "w") if args.output else None
+    try:
+        for record in batch.run(jobs, args.workers):
+            records.append(record)
+            if output:
+                output.write(json.dumps(record) + "\n")
+    finally:
+        if output:
+            output.close()
+
+    batch.print_summary(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m mmsimu")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay = commands.add_parser(
+        "replay", help="Replay the allocations of a trace with different policies"
+    )
+    replay.add_argument("trace", help="Trace file recorded with --trace")
+    replay.add_argument(
+        "--policy",
+        action="append",
+        choices=list(ALLOCATION_POLICIES),
+        help="Policy to replay with, can be repeated (default: all)",
+    )
+    replay.add_argument(
+        "--heap-size",
+        type=int,
+        help="Heap size in bytes (default: the extent of the recorded run)",
+    )
+    replay.add_argument("--json", action="store_true", help="Print results as JSON")
+    replay.set_defaults(run=replay_command)
+
+    bench = commands.add_parser("bench", help="Benchmark the simulator itself")
+    bench.add_argument(
+        "--workload",
+        action="append",
+        help="Workload to run, can be repeated (default: all)",
+    )
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("--output", metavar="FILE", help="Save results as JSON")
+    bench.add_argument(
+        "--baseline", metavar="FILE", help="Compare against previously saved results"
+    )
+    bench.set_defaults(run=bench_command)
+
+    inspect = commands.add_parser(
+        "inspect", help="Inspect the heap left by a run with --heap-file"
+    )
+    inspect.add_argument("heap_file", help="Heap file written with --heap-file")
+    inspect.add_argument(
+        "--address",
+        type=lambda address: int(address, 0),
+        help="Dump the memory at this address (default: list the live blocks)",
+    )
+    inspect.add_argument(
+        "--length", type=int, default=64, help="Bytes to dump (default: 64)"
+    )
+    inspect.set_defaults(run=inspect_command)
+
+    batch = commands.add_parser(
+        "batch", help="Run many simulated programs in parallel and collect reports"
+    )
+    batch.add_argument("scripts", nargs="*", help="Programs that call mmsimu_init")
+    batch.add_argument(
+        "--jobs",
+        metavar="FILE",
+        help="JSON list of jobs with per-program options, see mmsimu.batch",
+    )
+    batch.add_argument("--heap-size", type=int, help="Heap size for the scripts")
+    batch.add_argument("--seed", type=int, help="Seed for the scripts")
+    batch.add_argument("--policy", choices=list(ALLOCATION_POLICIES))
+    batch.add_argument("--checks", choices=list(CHECK_LEVELS))
+    batch.add_argument(
+        "--timeout", type=float, help="Seconds before a script is killed"
+    )
+    batch.add_argument(
+        "--workers", type=int, help="Programs run at once (default: one per core)"
+    )
+    batch.add_argument(
+        "--output", metavar="FILE", help="Save one JSON record per program"
+    )
+    batch.set_defaults(run=batch_command)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+main()
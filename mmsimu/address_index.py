@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class AddressIndex:
+    """
+    Live allocations ordered by address.
+
+    Exact lookups go through a dict. Addresses are also kept sorted in a
+    list of bounded-size chunks, so inserting or removing an address only
+    shifts the elements of one chunk, and "which allocation contains
+    address X" takes two binary searches.
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self):
+        self.by_address = {}
+        self.chunks = []  # Sorted lists of addresses
+        self.maxes = []  # Last address of each chunk
+
+    def add(self, allocation):
+        address = allocation.address
+        self.by_address[address] = allocation
+
+        if not self.chunks:
+            self.chunks.append([address])
+            self.maxes.append(address)
+            return
+
+        index = bisect_left(self.maxes, address)
+        if index == len(self.maxes):
+            index -= 1
+        chunk = self.chunks[index]
+        insort(chunk, address)
+        self.maxes[index] = chunk[-1]
+
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            half = self.CHUNK_SIZE
+            self.chunks[index : index + 1] = [chunk[:half], chunk[half:]]
+            self.maxes[index : index + 1] = [chunk[half - 1], chunk[-1]]
+
+    def remove(self, allocation):
+        address = allocation.address
+        del self.by_address[address]
+
+        index = bisect_left(self.maxes, address)
+        chunk = self.chunks[index]
+        del chunk[bisect_left(chunk, address)]
+        if chunk:
+            self.maxes[index] = chunk[-1]
+        else:
+            del self.chunks[index]
+            del self.maxes[index]
+
+    def copy(self):
+        """
+        Returns an index of the same allocations that can change
+        independently. The allocations themselves are shared.
+        """
+        clone = AddressIndex()
+        clone.by_address = self.by_address.copy()
+        clone.chunks = [chunk.copy() for chunk in self.chunks]
+        clone.maxes = self.maxes.copy()
+        return clone
+
+    def get(self, address):
+        """
+        Returns the allocation starting at `address`, or None.
+        """
+        return self.by_address.get(address)
+
+    def find(self, address):
+        """
+        Returns the allocation whose bytes include `address`, or None.
+        """
+        if not self.chunks:
+            return None
+
+        index = bisect_left(self.maxes, address)
+        if index == len(self.maxes):
+            start = self.maxes[-1]
+        else:
+            chunk = self.chunks[index]
+            position = bisect_right(chunk, address)
+            if position > 0:
+                start = chunk[position - 1]
+            elif index > 0:
+                start = self.maxes[index - 1]
+            else:
+                return None
+
+        allocation = self.by_address[start]
+        # Zero-sized blocks still own their start address
+        if address < start + max(allocation.size, 1):
+            return allocation
+
+        return None
+
+    def __iter__(self):
+        by_address = self.by_address
+        for chunk in self.chunks:
+            for address in chunk:
+                yield by_address[address]
+
+    def __len__(self):
+        return len(self.by_address)
@@ -1,16 +1,32 @@
-import mmsimu.types.integer
-import mmsimu.types.character
-
 from mmsimu.main import mmsimu_init
 from mmsimu.allocation import NULL
 from mmsimu.instance import get_instance
+from mmsimu.printf import (
+    printf,
+    snprintf,
+    sprintf,
+    stdout as printf_output,
+    to_python_string,
+)
+from mmsimu.types.pointer import PointerType
+from mmsimu.types.registry import (
+    char_t,
+    define_struct,
+    double_t,
+    float_t,
+    int8_t,
+    int16_t,
+    int32_t,
+    int64_t,
+    uint8_t,
+    uint16_t,
+    uint32_t,
+    uint64_t,
+)
 from mmsimu.with_caller_info import with_caller_info
 
-int32_t = mmsimu.types.integer.IntType()
-int32_ptr_t = mmsimu.types.integer.IntType()
-char_t = mmsimu.types.character.CharType()
-char_ptr_t = mmsimu.types.character.CharType()
-
+int32_ptr_t = PointerType(int32_t)
+char_ptr_t = PointerType(char_t)
 
 
 @with_caller_info
@@ -28,53 +44,47 @@ def free(ptr, caller):
     return get_instance().free(ptr, caller)
 
 
+@with_caller_info
+def calloc(count, size, caller):
+    return get_instance().calloc(count, size, caller)
+
+
+@with_caller_info
+def memcpy(destination, source, n_bytes, caller):
+    return get_instance().memcpy(destination, source, n_bytes, caller)
+
+
+@with_caller_info
+def memmove(destination, source, n_bytes, caller):
+    return get_instance().memmove(destination, source, n_bytes, caller)
+
+
+@with_caller_info
+def memset(destination, byte, n_bytes, caller):
+    return get_instance().memset(destination, byte, n_bytes, caller)
+
+
+@with_caller_info
+def memcmp(first, second, n_bytes, caller):
+    return get_instance().memcmp(first, second, n_bytes, caller)
+
+
 def sizeof(type):
     return get_instance().sizeof(type)
 
 
-def printf(format, *args):
-    # Reduced implementation of printf for demo purposes
-    in_format = False
-
-    current_arg = 0
-    result = ""
-    for c in format:
-        if in_format:
-            if c == "%":
-                result += "%"
-            elif c in ("p", "d", "i"):
-                value = int(args[current_arg])
-                if c == "p":
-                    result += f"0x{value:x}"
-                else:
-                    result += str(value)
-                current_arg += 1
-            elif c == "s":
-                result += to_python_string(args[current_arg])
-                current_arg += 1
-            elif c == "c":
-                result += args[current_arg]
-                current_arg += 1
-            else:
-                raise Exception(f"Unrecognized format in printf: `%{c}`")
-            in_format = False
-        else:
-            if c == "%":
-                in_format = True
-            else:
-                result += c
-
-    if current_arg != len(args):
-        raise Exception(f"Unused format arguments: {args[current_arg:]}")
-
-    print(result, end="")
-
-
-def to_python_string(s):
-    result = ""
-    i = 0
-    while s[i] != "\0":
-        result += s[i]
-        i += 1
-
-    return result
+def snapshot():
+    return get_instance().snapshot()
+
+
+def restore(snapshot):
+    get_instance().restore(snapshot)
+
+
+def print_heap_map(width=64):
+    mm = get_instance()
+    mm.stdout.write(mm.render_heap_map(width) + "\n")
+
+
+def fflush():
+    get_instance().stdout.flush()
@@ -1,79 +1,222 @@
-import random
-
 from mmsimu import log
+from mmsimu.events import READ, WRITE
 
 
 class Allocation:
-    def __init__(self, allocated_at, size, address=0, old_contents=None):
+    """
+    Block of simulated memory with every check enabled: use after free,
+    NULL dereferences, bounds and reads of uninitialized memory.
+
+    The subclasses below drop checks by overriding the accessors, so the
+    checking level of a simulation costs nothing on each access.
+    """
+
+    __slots__ = ("allocated_at", "address", "heap", "offset", "size", "freed")
+
+    # Whether the heap initialization flags are kept up to date for this block
+    tracks_initialization = True
+    # Bytes checked at once when iterating over the elements of a block
+    RUN_BYTES = 4096
+
+    def __init__(self, allocated_at, size, address=0, heap=None, offset=0):
         """
         allocated_at: Information about the function that triggered this allocation
         size: Number of bytes to allocate
         address: Irrelevant, used just to print a pointer for the simulation
-        old_contents: If reallocating, contents of the old allocation.
+        heap: Heap holding the contents of this allocation
+        offset: Position of the first byte of this allocation inside the heap
         """
         self.allocated_at = allocated_at
         self.address = address
-        self.bytes = old_contents or []
+        self.heap = heap
+        self.offset = offset
+        self.size = size
         self.freed = False
-        self.resize(size)
-
-    @property
-    def size(self):
-        return len(self.bytes)
 
     def mark_freed(self):
         self.freed = True
 
-    def resize(self, new_size):
-        if self.size > new_size:
-            self.bytes = self.bytes[:new_size]
-        elif self.size < new_size:
-            # None = uninitialized
-            self.bytes = self.bytes + [None for _ in range(self.size, new_size)]
-
-    def read(self, n_bytes, offset=0):
+    def span(self, offset, n_bytes, op=READ):
+        """
+        Checks that the `n_bytes` at base+`offset` can be read (op=READ) or
+        written (op=WRITE) and returns the position of the first one in the
+        heap.
+        """
+        verb, gerund = ("read", "reading") if op == READ else ("write", "writing")
         assert (
             not self.freed
-        ), f"Segmentation fault -- read after free {self.allocated_at}"
+        ), f"Segmentation fault -- {verb} after free {self.allocated_at}"
         assert (
-            self != NULL
-        ), f"Trying to read NULL pointer from failed allocation at {self.allocated_at}"
+            self.address != NULL
+        ), f"Trying to {verb} NULL pointer from failed allocation at {self.allocated_at}"
 
-        if not (0 < offset + n_bytes <= self.size):
+        if not (0 <= offset and 0 < offset + n_bytes <= self.size):
             raise Exception(
-                f"Segmentation fault -- reading at base+{offset}, alloc size={self.size}, requested={n_bytes}"
+                f"Segmentation fault -- {gerund} at base+{offset}, alloc size={self.size}, requested={n_bytes}"
             )
 
-        warning_sent = False
-        for i in range(offset, offset + n_bytes):
-            if self.bytes[i] is None:
-                if not warning_sent:
-                    warning_sent = True
-                    log.uninit("[WARNING] Reading uninitialized memory")
+        if self.heap.observers:
+            self.heap.notify_access(op, self.address + offset, n_bytes)
 
-                self.bytes[i] = random.randint(0, 255)
+        return self.offset + offset
 
-        return bytes(self.bytes[offset : offset + n_bytes])
+    def read(self, n_bytes, offset=0):
+        start = self.span(offset, n_bytes, READ)
+        if self.heap.fill_uninitialized(start, n_bytes) and log.uninit.enabled:
+            log.uninit.emit("uninit_read", size=n_bytes, address=self.address + offset)
 
-    def write(self, value, offset=0):
-        assert (
-            not self.freed
-        ), f"Segmentation fault -- read after free {self.allocated_at}"
-        assert (
-            self != NULL
-        ), f"Trying to write NULL pointer from failed allocation at {self.allocated_at}"
+        return self.heap.read(start, n_bytes)
 
-        if not (0 < offset + len(value) <= self.size):
-            raise Exception(
-                f"Segmentation fault -- writing at base+{offset}, alloc size={self.size}, requested={len(value)}"
-            )
+    def read_string(self, offset=0, limit=None):
+        """
+        Reads a NUL-terminated string starting at base+`offset` and returns
+        its bytes, without the NUL. If `limit` is given at most that many
+        bytes are read, and the string does not need to be terminated.
+
+        The NUL is found with one search over the heap. Uninitialized runs
+        in the way are turned into garbage first, and only their bytes up to
+        the NUL are marked as read, like reading them one byte at a time
+        would.
+        """
+        if self.freed or self.address == NULL or not 0 <= offset < self.size:
+            # Let span() report why this can't be read
+            self.span(offset, 1, READ)
+
+        heap = self.heap
+        available = self.size - offset
+        start = self.offset + offset
+        end = start + (available if limit is None else min(limit, available))
+        position = start
+        found_uninitialized = False
+        while True:
+            uninitialized = heap.initialized.find(b"\x00", position, end)
+            stop = end if uninitialized == -1 else uninitialized
+            nul = heap.memory.find(b"\x00", position, stop)
+            if nul == -1 and uninitialized != -1:
+                run_end = heap.initialized.find(b"\x01", uninitialized, end)
+                run_end = end if run_end == -1 else run_end
+                heap.fill_uninitialized(
+                    uninitialized, run_end - uninitialized, mark=False
+                )
+                found_uninitialized = True
+                nul = heap.memory.find(b"\x00", uninitialized, run_end)
+                read_end = run_end if nul == -1 else nul + 1
+                heap.mark_initialized(uninitialized, read_end - uninitialized)
+                if nul == -1:
+                    position = run_end
+                    continue
+
+            if nul != -1:
+                length, n_bytes = nul - start, nul - start + 1
+            else:
+                length = n_bytes = end - start
+            break
+
+        if n_bytes == length and (limit is None or limit > available):
+            # Not terminated inside the block, C would keep reading past it
+            self.span(offset, available + 1, READ)
+        if n_bytes:
+            self.span(offset, n_bytes, READ)
+        if found_uninitialized and log.uninit.enabled:
+            log.uninit.emit("uninit_read", size=n_bytes, address=self.address + offset)
+
+        return heap.read(start, length)
+
+    def load(self, type, offset=0):
+        """
+        Reads a value of `type` at base+`offset`, decoding it in place.
+        """
+        start = self.span(offset, type.size, READ)
+        if self.heap.fill_uninitialized(start, type.size) and log.uninit.enabled:
+            log.uninit.emit("uninit_read", size=type.size, address=self.address + offset)
+
+        return type.unpack_from(self.heap.memory, start)
+
+    def iter_load(self, type, offset=0, until=None):
+        """
+        Yields the values of `type` stored from base+`offset` on, up to the
+        end of the block or, if `until` is given, up to the first element
+        equal to it. Walking past the end of the block looking for `until`
+        fails like an out of bounds read.
+
+        Accesses are checked once per run of RUN_BYTES, not per element.
+        When `until` is found, only the elements up to it are checked and
+        count as read.
+        """
+        size = type.size
+        unpack_from = type.unpack_from
+        stop = None if until is None else type.to_native(type.from_native(until))
+        run = max(1, self.RUN_BYTES // size)
+        heap = self.heap
+        if self.freed or self.address == NULL:
+            # Let span() report why this can't be read
+            self.span(offset, size, READ)
+
+        while True:
+            remaining = (self.size - offset) // size
+            if remaining <= 0:
+                if until is None:
+                    return
+                # Let span() report the read past the end. Unchecked blocks
+                # keep reading the heap instead, like C would.
+                self.span(offset, size, READ)
+                remaining = (heap.size - self.offset - offset) // size
+                if remaining <= 0:
+                    return
+
+            n_bytes = min(run, remaining) * size
+            start = self.offset + offset
+            if self.tracks_initialization:
+                # Uninitialized bytes only count as read once it is known
+                # whether the walk reaches them
+                heap.fill_uninitialized(start, n_bytes, mark=False)
+            memory = heap.memory
+            values = [
+                unpack_from(memory, position)
+                for position in range(start, start + n_bytes, size)
+            ]
+            found = False
+            if stop is not None:
+                try:
+                    values = values[: values.index(stop)]
+                    n_bytes = (len(values) + 1) * size
+                    found = True
+                except ValueError:
+                    pass
+
+            self.span(offset, n_bytes, READ)
+            if (
+                self.tracks_initialization
+                and heap.mark_initialized(start, n_bytes)
+                and log.uninit.enabled
+            ):
+                log.uninit.emit(
+                    "uninit_read", size=n_bytes, address=self.address + offset
+                )
 
-        for i, byte in enumerate(value):
-            self.bytes[offset + i] = byte
+            yield from values
+            if found:
+                return
+            offset += n_bytes
+
+    def write(self, value, offset=0):
+        self.heap.write(self.span(offset, len(value), WRITE), value)
+
+    def store(self, type, value, offset=0):
+        """
+        Writes `value` as a `type` at base+`offset`.
+        """
+        self.heap.write(self.span(offset, type.size, WRITE), type.from_native(value))
 
     def into_allocation(self):
         return self
 
+    def into_target(self):
+        """
+        Returns the allocation and the offset inside it this pointer refers to.
+        """
+        return self, 0
+
     @property
     def deref(self):
         raise Exception("Can't dereference raw memory -- cast it to a type first")
@@ -92,4 +235,92 @@ class Allocation:
         return int(self) == int(other)
 
 
+class BoundsCheckedAllocation(Allocation):
+    """
+    Only checks that accesses stay inside the block. Uninitialized memory
+    reads whatever the heap holds and is not reported, and accesses are not
+    reported to observers.
+    """
+
+    __slots__ = ()
+
+    tracks_initialization = False
+
+    def span(self, offset, n_bytes, op=READ):
+        if not (0 <= offset and 0 < offset + n_bytes <= self.size):
+            raise Exception(
+                f"Segmentation fault -- accessing base+{offset}, alloc size={self.size}, requested={n_bytes}"
+            )
+
+        return self.offset + offset
+
+    def read(self, n_bytes, offset=0):
+        return self.heap.read(self.span(offset, n_bytes), n_bytes)
+
+    def read_string(self, offset=0, limit=None):
+        if not 0 <= offset < self.size:
+            self.span(offset, 1)
+
+        available = self.size - offset
+        start = self.offset + offset
+        end = start + (available if limit is None else min(limit, available))
+        nul = self.heap.memory.find(b"\x00", start, end)
+        if nul == -1:
+            if limit is None or limit > available:
+                self.span(offset, available + 1)
+            nul = end
+
+        return self.heap.read(start, nul - start)
+
+    def load(self, type, offset=0):
+        return type.unpack_from(self.heap.memory, self.span(offset, type.size))
+
+    def write(self, value, offset=0):
+        self.heap.store(self.span(offset, len(value)), value)
+
+    def store(self, type, value, offset=0):
+        start = self.span(offset, type.size)
+        heap = self.heap
+        if heap.snapshots:
+            heap.preserve(start, type.size)
+        type.pack_into(heap.memory, start, value)
+
+
+class UncheckedAllocation(BoundsCheckedAllocation):
+    """
+    No checks at all, for trusted programs where only the allocation
+    accounting (leaks, peak usage, per-site stats) matters. Out of bounds
+    accesses silently touch neighbouring blocks.
+    """
+
+    __slots__ = ()
+
+    def span(self, offset, n_bytes, op=READ):
+        return self.offset + offset
+
+    def read(self, n_bytes, offset=0):
+        return self.heap.read(self.offset + offset, n_bytes)
+
+    def read_string(self, offset=0, limit=None):
+        # Unterminated strings run until the end of the heap
+        heap = self.heap
+        start = self.offset + offset
+        end = heap.size if limit is None else min(start + limit, heap.size)
+        nul = heap.memory.find(b"\x00", start, end)
+        return heap.read(start, (end if nul == -1 else nul) - start)
+
+    def load(self, type, offset=0):
+        return type.unpack_from(self.heap.memory, self.offset + offset)
+
+    def write(self, value, offset=0):
+        self.heap.store(self.offset + offset, value)
+
+    def store(self, type, value, offset=0):
+        start = self.offset + offset
+        heap = self.heap
+        if heap.snapshots:
+            heap.preserve(start, type.size)
+        type.pack_into(heap.memory, start, value)
+
+
 NULL = 0
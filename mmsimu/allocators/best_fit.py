@@ -0,0 +1,32 @@
+from bisect import bisect_left, insort
+
+from mmsimu.allocators.free_list import FreeListAllocator
+
+
+class BestFitAllocator(FreeListAllocator):
+    """
+    Serves each request from the smallest free block that is large enough.
+    Ties are broken by address.
+    """
+
+    def __init__(self, heap_size):
+        self.by_size = []  # (size, start) of every free block, sorted
+        super().__init__(heap_size)
+
+    def copy(self):
+        clone = super().copy()
+        clone.by_size = self.by_size.copy()
+        return clone
+
+    def _insert(self, start, size):
+        insort(self.by_size, (size, start))
+
+    def _remove(self, start, size):
+        del self.by_size[bisect_left(self.by_size, (size, start))]
+
+    def _find(self, size):
+        index = bisect_left(self.by_size, (size, -1))
+        if index == len(self.by_size):
+            return None
+
+        return self.by_size[index][1]
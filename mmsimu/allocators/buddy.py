@@ -0,0 +1,158 @@
+import copy
+from bisect import bisect_right
+
+
+class BuddyAllocator:
+    """
+    Binary buddy allocator.
+
+    Every block has a power-of-two size and is aligned to it. Requests are
+    rounded up to the next power of two, and larger free blocks are split
+    in halves ("buddies") until one of the right size is available. When
+    a block is freed it is merged back with its buddy for as long as the
+    buddy is free too.
+
+    Heaps whose size is not a power of two are split into aligned
+    power-of-two chunks that never merge with each other.
+    """
+
+    def __init__(self, heap_size):
+        self.heap_size = heap_size
+        self.free_lists = [{} for _ in range(max(heap_size, 1).bit_length())]
+        self.non_empty = 0  # Bit `k` is set if there are free blocks of order `k`
+        self.used = {}  # start -> order
+        self.in_use = 0
+        self.free_bytes = 0
+        self.top = 0
+
+        self.chunk_starts = []
+        self.chunk_orders = []
+        start = 0
+        for order in reversed(range(heap_size.bit_length())):
+            if heap_size & (1 << order):
+                self.chunk_starts.append(start)
+                self.chunk_orders.append(order)
+                self._put_free(start, order)
+                start += 1 << order
+
+    def allocate(self, size):
+        """
+        Returns the offset of a block of at least `size` bytes, or None if
+        no free block is large enough.
+        """
+        order = (max(size, 1) - 1).bit_length()
+        candidates = self.non_empty >> order
+        if not candidates:
+            return None
+
+        block_order = order + (candidates & -candidates).bit_length() - 1
+        start = self._take_any_free(block_order)
+        while block_order > order:
+            block_order -= 1
+            self._put_free(start + (1 << block_order), block_order)
+
+        self.used[start] = order
+        self.in_use += 1 << order
+        self.top = max(self.top, start + (1 << order))
+        return start
+
+    def free(self, start):
+        """
+        Releases the block at `start` and returns its size.
+        """
+        order = self.used.pop(start)
+        block_size = 1 << order
+        self.in_use -= block_size
+
+        max_order = self.chunk_orders[bisect_right(self.chunk_starts, start) - 1]
+        while order < max_order:
+            buddy = start ^ (1 << order)
+            if buddy not in self.free_lists[order]:
+                break
+            self._take_free(buddy, order)
+            start = min(start, buddy)
+            order += 1
+
+        self._put_free(start, order)
+        return block_size
+
+    def resize(self, start, size):
+        """
+        Grows or shrinks the block at `start` to hold `size` bytes without
+        moving it. Shrinking frees the upper halves. Growing needs the block
+        to be aligned to the new order and the buddies above it to be free
+        as a whole; otherwise False is returned and nothing changes.
+        """
+        order = self.used[start]
+        new_order = (max(size, 1) - 1).bit_length()
+        if new_order > order:
+            max_order = self.chunk_orders[bisect_right(self.chunk_starts, start) - 1]
+            if new_order > max_order or start & ((1 << new_order) - 1):
+                return False
+            buddies = range(order, new_order)
+            if any(start + (1 << o) not in self.free_lists[o] for o in buddies):
+                return False
+            for buddy_order in buddies:
+                self._take_free(start + (1 << buddy_order), buddy_order)
+        else:
+            for buddy_order in range(new_order, order):
+                self._put_free(start + (1 << buddy_order), buddy_order)
+
+        self.used[start] = new_order
+        self.in_use += (1 << new_order) - (1 << order)
+        self.top = max(self.top, start + (1 << new_order))
+        return True
+
+    def block_size(self, start):
+        return 1 << self.used[start]
+
+    def copy(self):
+        """
+        Returns an allocator in the same state that can change independently.
+        """
+        clone = copy.copy(self)
+        clone.free_lists = [blocks.copy() for blocks in self.free_lists]
+        clone.used = self.used.copy()
+        return clone
+
+    def free_blocks(self):
+        """
+        Yields (start, size) for every free block, in address order.
+        """
+        yield from sorted(
+            (start, 1 << order)
+            for order, blocks in enumerate(self.free_lists)
+            for start in blocks
+        )
+
+    def free_histogram(self):
+        """
+        Number of free blocks per order, indexed by order.
+        """
+        return [len(blocks) for blocks in self.free_lists]
+
+    def largest_free_block(self):
+        if not self.non_empty:
+            return 0
+
+        return 1 << (self.non_empty.bit_length() - 1)
+
+    def _put_free(self, start, order):
+        self.free_lists[order][start] = None
+        self.non_empty |= 1 << order
+        self.free_bytes += 1 << order
+
+    def _take_free(self, start, order):
+        blocks = self.free_lists[order]
+        del blocks[start]
+        if not blocks:
+            self.non_empty &= ~(1 << order)
+        self.free_bytes -= 1 << order
+
+    def _take_any_free(self, order):
+        blocks = self.free_lists[order]
+        start, _ = blocks.popitem()
+        self.free_bytes -= 1 << order
+        if not blocks:
+            self.non_empty &= ~(1 << order)
+        return start
@@ -0,0 +1,33 @@
+from bisect import bisect_left, insort
+
+from mmsimu.allocators.free_list import FreeListAllocator
+
+
+class FirstFitAllocator(FreeListAllocator):
+    """
+    Serves each request from the lowest-addressed free block that is large
+    enough.
+    """
+
+    def __init__(self, heap_size):
+        self.starts = []  # Free block starts, in address order
+        super().__init__(heap_size)
+
+    def copy(self):
+        clone = super().copy()
+        clone.starts = self.starts.copy()
+        return clone
+
+    def _insert(self, start, size):
+        insort(self.starts, start)
+
+    def _remove(self, start, size):
+        del self.starts[bisect_left(self.starts, start)]
+
+    def _find(self, size):
+        free_starts = self.free_starts
+        for start in self.starts:
+            if free_starts[start] >= size:
+                return start
+
+        return None
@@ -0,0 +1,165 @@
+import copy
+
+
+class FreeListAllocator:
+    """
+    Base class for allocators that keep the free space of the heap as a set
+    of (start, size) blocks.
+
+    Allocating splits the chosen free block and returns the unused tail to
+    the free set. Freeing a block merges it with any free neighbour, so
+    adjacent free blocks never coexist.
+
+    Free blocks are also bucketed in power-of-two size classes, class `k`
+    holding the blocks with sizes in [2**k, 2**(k+1)), so that the free
+    space can be summarized without walking every block.
+
+    Subclasses pick which free block serves a request by implementing
+    `_insert`, `_remove` and `_find`.
+    """
+
+    def __init__(self, heap_size):
+        self.heap_size = heap_size
+        self.used = {}  # start -> size
+        self.free_starts = {}  # start -> size
+        self.free_ends = {}  # end -> start
+        self.in_use = 0
+        self.free_bytes = 0
+        self.classes = [{} for _ in range(max(heap_size, 1).bit_length())]
+        self.non_empty = 0  # Bit `k` is set if class `k` has free blocks
+        # End of the highest block ever handed out, i.e. how far the heap grew
+        self.top = 0
+        if heap_size > 0:
+            self._put_free(0, heap_size)
+
+    def allocate(self, size):
+        """
+        Returns the offset of a block of at least `size` bytes, or None if
+        no free block is large enough.
+        """
+        size = max(size, 1)
+        start = self._find(size)
+        if start is None:
+            return None
+
+        block_size = self._take_free(start)
+        if block_size > size:
+            # The block we took was surrounded by used memory, so the tail
+            # does not need to be merged with anything.
+            self._put_free(start + size, block_size - size)
+
+        self.used[start] = size
+        self.in_use += size
+        self.top = max(self.top, start + size)
+        return start
+
+    def free(self, start):
+        """
+        Releases the block at `start` and returns its size.
+        """
+        block_size = self.used.pop(start)
+        self.in_use -= block_size
+
+        size = block_size
+        end = start + size
+        if end in self.free_starts:
+            size += self._take_free(end)
+        if (previous_start := self.free_ends.get(start)) is not None:
+            size += self._take_free(previous_start)
+            start = previous_start
+
+        self._put_free(start, size)
+        return block_size
+
+    def resize(self, start, size):
+        """
+        Grows or shrinks the block at `start` to `size` bytes without moving
+        it. Returns False, leaving everything as it was, if growing it needs
+        more than the free block right after it.
+        """
+        size = max(size, 1)
+        old_size = self.used[start]
+        end = start + old_size
+        if size > old_size:
+            available = self.free_starts.get(end, 0)
+            if size - old_size > available:
+                return False
+
+            self._take_free(end)
+            if available > size - old_size:
+                self._put_free(start + size, available - (size - old_size))
+        elif size < old_size:
+            tail = old_size - size
+            if end in self.free_starts:
+                tail += self._take_free(end)
+            self._put_free(start + size, tail)
+
+        self.used[start] = size
+        self.in_use += size - old_size
+        self.top = max(self.top, start + size)
+        return True
+
+    def block_size(self, start):
+        return self.used[start]
+
+    def copy(self):
+        """
+        Returns an allocator in the same state that can change independently.
+        """
+        clone = copy.copy(self)
+        clone.used = self.used.copy()
+        clone.free_starts = self.free_starts.copy()
+        clone.free_ends = self.free_ends.copy()
+        clone.classes = [blocks.copy() for blocks in self.classes]
+        return clone
+
+    def free_blocks(self):
+        """
+        Yields (start, size) for every free block, in address order.
+        """
+        yield from sorted(self.free_starts.items())
+
+    def free_histogram(self):
+        """
+        Number of free blocks per size class, indexed by class.
+        """
+        return [len(blocks) for blocks in self.classes]
+
+    def largest_free_block(self):
+        if not self.non_empty:
+            return 0
+
+        # Only the blocks of the highest non-empty class can be the largest
+        free_starts = self.free_starts
+        top_class = self.classes[self.non_empty.bit_length() - 1]
+        return max(free_starts[start] for start in top_class)
+
+    def _put_free(self, start, size):
+        self.free_starts[start] = size
+        self.free_ends[start + size] = start
+        self.free_bytes += size
+        size_class = size.bit_length() - 1
+        self.classes[size_class][start] = None
+        self.non_empty |= 1 << size_class
+        self._insert(start, size)
+
+    def _take_free(self, start):
+        size = self.free_starts.pop(start)
+        del self.free_ends[start + size]
+        self.free_bytes -= size
+        size_class = size.bit_length() - 1
+        blocks = self.classes[size_class]
+        del blocks[start]
+        if not blocks:
+            self.non_empty &= ~(1 << size_class)
+        self._remove(start, size)
+        return size
+
+    def _insert(self, start, size):
+        raise NotImplementedError()
+
+    def _remove(self, start, size):
+        raise NotImplementedError()
+
+    def _find(self, size):
+        raise NotImplementedError()
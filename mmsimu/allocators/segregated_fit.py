@@ -0,0 +1,36 @@
+from mmsimu.allocators.free_list import FreeListAllocator
+
+
+class SegregatedFitAllocator(FreeListAllocator):
+    """
+    Uses the power-of-two size classes kept by FreeListAllocator as one
+    free list per class.
+
+    A request of `size` bytes is served from the first non-empty class
+    whose blocks are all guaranteed to fit, which takes O(1). Only when
+    every such class is empty the class right below is searched for a
+    block that happens to be large enough.
+    """
+
+    def _insert(self, start, size):
+        pass
+
+    def _remove(self, start, size):
+        pass
+
+    def _find(self, size):
+        # Smallest class whose blocks are all at least `size` bytes long
+        size_class = (size - 1).bit_length()
+        candidates = self.non_empty >> size_class
+        if candidates:
+            size_class += (candidates & -candidates).bit_length() - 1
+            # Most recently freed block first, it is the most likely to be cached
+            return next(reversed(self.classes[size_class]))
+
+        if 0 < size_class <= len(self.classes) and size != 1 << size_class:
+            free_starts = self.free_starts
+            for start in self.classes[size_class - 1]:
+                if free_starts[start] >= size:
+                    return start
+
+        return None
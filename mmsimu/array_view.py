@@ -0,0 +1,113 @@
+"""
+NumPy views over simulated memory. NumPy is optional, it is only needed
+to create views.
+"""
+
+from mmsimu.events import READ
+
+_simulated_array = None
+
+
+def _simulated_array_class():
+    """
+    Defines SimulatedArray on first use, so NumPy is only imported by
+    programs that create views.
+    """
+    global _simulated_array
+    if _simulated_array is not None:
+        return _simulated_array
+
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Array views over simulated memory require NumPy")
+
+    class SimulatedArray(numpy.ndarray):
+        """
+        Typed view over the bytes of an allocation.
+
+        Writing through the view (item assignment, fill() or ufuncs with
+        `out=`) marks the written elements as initialized. Reads through the
+        view are not checked.
+        """
+
+        def __array_finalize__(self, obj):
+            # Only views created by array_view() or sliced from one track
+            # initialization, anything else NumPy derives is a new array.
+            self.initialized = None
+
+        def __setitem__(self, key, value):
+            super().__setitem__(key, value)
+            if self.initialized is not None:
+                self.initialized[key] = 1
+
+        def __getitem__(self, key):
+            result = super().__getitem__(key)
+            if isinstance(result, SimulatedArray):
+                if isinstance(key, slice) and self.initialized is not None:
+                    # Basic slicing shares memory with the simulated heap
+                    result.initialized = self.initialized[key]
+                elif result.initialized is None:
+                    result = result.view(numpy.ndarray)
+            return result
+
+        def fill(self, value):
+            super().fill(value)
+            if self.initialized is not None:
+                self.initialized[...] = 1
+
+        def __array_ufunc__(self, ufunc, method, *inputs, out=None, **kwargs):
+            inputs = tuple(_plain(value) for value in inputs)
+            if out is not None:
+                kwargs["out"] = tuple(_plain(array) for array in out)
+
+            result = getattr(ufunc, method)(*inputs, **kwargs)
+            if out is None:
+                return result
+
+            for array in out:
+                if isinstance(array, SimulatedArray) and array.initialized is not None:
+                    array.initialized[...] = 1
+            # Keep in-place operations (`view += 1`) returning the view itself
+            return out[0] if len(out) == 1 else out
+
+    def _plain(value):
+        if isinstance(value, SimulatedArray):
+            return value.view(numpy.ndarray)
+        return value
+
+    _simulated_array = SimulatedArray
+    return SimulatedArray
+
+
+def array_view(allocation, offset, dtype, count):
+    """
+    Returns a SimulatedArray of `count` elements of `dtype` over the bytes
+    of `allocation` starting at base+`offset`.
+
+    Bounds and use-after-free are checked once, here. Uninitialized bytes
+    in the span are filled with garbage but stay marked as uninitialized
+    until they are written.
+    """
+    SimulatedArray = _simulated_array_class()
+    import numpy
+
+    dtype = numpy.dtype(dtype)
+    if count == 0:
+        return numpy.empty(0, dtype).view(SimulatedArray)
+
+    n_bytes = count * dtype.itemsize
+    start = allocation.span(offset, n_bytes, READ)
+    heap = allocation.heap
+    if heap.snapshots:
+        # Writes through the view bypass the heap, save its pages up front
+        heap.preserve(start, n_bytes)
+    view = numpy.frombuffer(heap.memory, dtype, count, start).view(SimulatedArray)
+    # Snapshots taken while the view is alive save its pages up front too
+    heap.track_view(view, start, n_bytes)
+    if allocation.tracks_initialization:
+        heap.fill_uninitialized(start, n_bytes, mark=False)
+        view.initialized = numpy.frombuffer(
+            heap.initialized, numpy.uint8, n_bytes, start
+        ).reshape(count, dtype.itemsize)
+    return view
@@ -0,0 +1,153 @@
+"""
+Runs many simulated programs at once.
+
+Every program runs in its own interpreter, started with the simulator
+options of its job (`--heap-size`, `--seed`, ...) and `--report FILE`, so
+that mmsimu_init leaves a JSON summary of the run behind. Jobs are handed
+to a pool of worker threads, one per core by default, that only wait on
+their interpreter, so the programs themselves run in parallel.
+
+A job is a dict:
+
+    script     Path of the program
+    args       Extra command line arguments (default: none)
+    heap_size  Heap size in bytes (default: the one passed to mmsimu_init)
+    seed       Seed for uninitialized memory (default: random)
+    policy     Allocation policy (default: the one passed to mmsimu_init)
+    checks     Checking level (default: the one passed to mmsimu_init)
+    timeout    Seconds before the program is killed (default: no limit)
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mmsimu.with_caller_info import error_call_site
+
+
+# Options forwarded to the simulated program as `--option value`
+JOB_OPTIONS = ("heap_size", "seed", "policy", "checks")
+
+
+def error_kind(error):
+    message = str(error)
+    if "Segmentation fault" in message or "NULL pointer" in message:
+        return "segfault"
+    if isinstance(error, AssertionError):
+        return "assertion"
+    return "error"
+
+
+def program_report(mm, error, seconds):
+    """
+    Summary of a finished simulation, see save_report.
+    """
+    stats = mm.heap_stats()
+    report = {
+        "status": "ok" if error is None else error_kind(error),
+        "seconds": seconds,
+        "peak_in_use": stats["peak_in_use"],
+        # Kilobytes on Linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "leaked_bytes": stats["in_use"],
+        "leaked_blocks": stats["live_blocks"],
+        "leaks": [site for site in stats["sites"] if site["live_blocks"]],
+        "error": None,
+    }
+    if error is not None:
+        site = error_call_site(error)
+        report["error"] = {
+            "type": type(error).__name__,
+            "message": str(error),
+            "site": str(site) if site else None,
+            "filename": site.filename if site else None,
+        }
+
+    return report
+
+
+def save_report(path, mm, error, seconds):
+    with open(path, "w") as report_file:
+        json.dump(program_report(mm, error, seconds), report_file)
+
+
+def run_job(job):
+    """
+    Runs one job and returns its record: the job itself, the exit code,
+    the wall-clock time and the report written by the program. Programs
+    that time out or die before writing a report get a "timeout" or
+    "crashed" status, with the end of their error output.
+    """
+    with tempfile.TemporaryDirectory(prefix="mmsimu-batch-") as directory:
+        report_path = os.path.join(directory, "report.json")
+        command = [sys.executable, job["script"], *job.get("args", ())]
+        for option in JOB_OPTIONS:
+            if job.get(option) is not None:
+                command += [f"--{option.replace('_', '-')}", str(job[option])]
+        command += ["--report", report_path]
+
+        start = time.perf_counter()
+        try:
+            process = subprocess.run(
+                command,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=job.get("timeout"),
+            )
+        except subprocess.TimeoutExpired:
+            return {
+                "job": job,
+                "exit_code": None,
+                "wall_seconds": time.perf_counter() - start,
+                "status": "timeout",
+            }
+
+        record = {
+            "job": job,
+            "exit_code": process.returncode,
+            "wall_seconds": time.perf_counter() - start,
+        }
+        try:
+            with open(report_path) as report_file:
+                record.update(json.load(report_file))
+        except OSError:
+            record["status"] = "crashed"
+            record["stderr"] = process.stderr.decode(errors="replace")[-2000:]
+
+        return record
+
+
+def run(jobs, workers=None):
+    """
+    Runs every job, `workers` at a time (default: one per core), and yields
+    their records in the order of `jobs`.
+    """
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+        yield from pool.map(run_job, jobs)
+
+
+def load_jobs(path):
+    """
+    Reads a JSON list of jobs. Scripts are relative to the file.
+    """
+    with open(path) as jobs_file:
+        jobs = json.load(jobs_file)
+
+    base = os.path.dirname(path)
+    return [{**job, "script": os.path.join(base, job["script"])} for job in jobs]
+
+
+def print_summary(records):
+    print(f"{'script':<40}{'status':>12}{'leaked':>10}{'seconds':>10}  error site")
+    for record in records:
+        error = record.get("error") or {}
+        leaked = record.get("leaked_bytes", "")
+        print(
+            f"{record['job']['script']:<40}{record['status']:>12}{leaked:>10}"
+            f"{record['wall_seconds']:>10.2f}  {error.get('site') or ''}"
+        )
@@ -0,0 +1,262 @@
+"""
+Benchmarks for the hot paths of the simulator itself.
+
+Every workload is seeded and runs in a fresh process, so that its peak RSS
+is not polluted by the previous ones. Results can be saved as JSON and
+compared against a previous run.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import time
+
+from mmsimu.all import (
+    char_ptr_t,
+    free,
+    int32_ptr_t,
+    int32_t,
+    malloc,
+    printf,
+    realloc,
+    sizeof,
+    snprintf,
+)
+from mmsimu.instance import set_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.printf import stdout as printf_output
+
+
+WORKLOADS = {}
+
+
+class Timer:
+    """
+    Measures a workload from its start, or from the last restart() if only
+    part of it has to be measured.
+    """
+
+    def __init__(self):
+        self.restart()
+
+    def restart(self):
+        self.start = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def workload(name, **params):
+    def register(fn):
+        WORKLOADS[name] = (fn, params)
+        return fn
+
+    return register
+
+
+def _manager(heap_size, checks="full", realloc_mode="move"):
+    mm = MemoryManager(heap_size, checks=checks, realloc_mode=realloc_mode)
+    set_instance(mm)
+    return mm
+
+
+@workload("churn-live-10k-sanitize", live=10_000, operations=100_000, checks="sanitize")
+@workload("churn-live-100k", live=100_000, operations=100_000)
+@workload("churn-live-10k", live=10_000, operations=100_000)
+@workload("churn-live-100", live=100, operations=100_000)
+def churn(rng, timer, live, operations, checks="full"):
+    """
+    Random malloc/free pairs on top of `live` blocks that stay allocated.
+    """
+    sizes = [8, 16, 24, 32, 48, 64, 128, 256]
+    _manager(live * 512, checks)
+    blocks = [malloc(rng.choice(sizes)) for _ in range(live)]
+
+    for _ in range(operations):
+        index = rng.randrange(live)
+        free(blocks[index])
+        blocks[index] = malloc(rng.choice(sizes))
+
+    for block in blocks:
+        free(block)
+
+    return live * 2 + operations * 2
+
+
+@workload("int-array-access-sanitize", length=100_000, checks="sanitize")
+@workload("int-array-access-accounting", length=100_000, checks="accounting")
+@workload("int-array-access-bounds", length=100_000, checks="bounds")
+@workload("int-array-access", length=100_000, checks="full")
+def int_array_access(rng, timer, length, checks):
+    """
+    Writes and then reads every element of an int32_t array via Value.
+    """
+    # Room for the redzones of checks="sanitize"
+    _manager(length * 4 + 64, checks)
+    array = int32_ptr_t(malloc(sizeof(int32_t) * length))
+    for i in range(length):
+        array[i] = rng.randrange(1 << 31)
+
+    total = 0
+    for i in range(length):
+        total += array[i]
+
+    free(array)
+    return length * 2
+
+
+@workload("matrix-columns-cache", n=256)
+def matrix_columns_cache(rng, timer, n):
+    """
+    Column-major traversal of an n x n int32_t matrix with the cache model
+    attached.
+    """
+    from mmsimu.cache import CacheSimulator
+
+    mm = _manager(n * n * 4)
+    simulator = mm.add_observer(CacheSimulator())
+    matrix = int32_ptr_t(malloc(sizeof(int32_t) * n * n))
+    for j in range(n):
+        for i in range(n):
+            matrix[i * n + j] = i
+
+    simulator.flush()
+    free(matrix)
+    return n * n
+
+
+@workload("realloc-string-building-in-place", length=5_000, realloc_mode="in-place")
+@workload("realloc-string-building", length=5_000)
+def realloc_string_building(rng, timer, length, realloc_mode="move"):
+    """
+    Appends one character at a time, reallocating on every append like
+    example_str.py.
+    """
+    _manager(length * 4, realloc_mode=realloc_mode)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    string = char_ptr_t(malloc(1))
+    string[0] = 0
+    for i in range(length):
+        string = char_ptr_t(realloc(string, i + 2))
+        string[i] = rng.choice(letters)
+        string[i + 1] = 0
+
+    free(string)
+    return length
+
+
+@workload("printf-long-string", length=10_000, repeat=20)
+def printf_long_string(rng, timer, length, repeat):
+    """
+    Prints a long simulated string with printf("%s").
+    """
+    _manager(length + 1)
+    string = char_ptr_t(malloc(length + 1))
+    for i in range(length):
+        string[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    string[length] = 0
+
+    for _ in range(repeat):
+        printf("%s\n", string)
+
+    free(string)
+    return length * repeat
+
+
+@workload("snprintf-formatting", repeat=20_000)
+def snprintf_formatting(rng, timer, repeat):
+    """
+    Formats numbers and strings into a simulated buffer with snprintf.
+    """
+    _manager(128)
+    buffer = char_ptr_t(malloc(64))
+    words = ["alpha", "beta", "gamma", "delta"]
+    for i in range(repeat):
+        snprintf(buffer, 64, "%5d: %-8s|%08.3f|%#x", i, rng.choice(words), i / 7, i)
+
+    free(buffer)
+    return repeat
+
+
+@workload("leak-summary", call_sites=2_000, blocks_per_site=10)
+def leak_summary(rng, timer, call_sites, blocks_per_site):
+    """
+    Leak summary of a heap with many distinct allocation call sites.
+    """
+    mm = _manager(call_sites * blocks_per_site * 64)
+    source = "def leak(malloc):\n" + "".join(
+        f"    malloc({rng.randint(1, 64)})\n" for _ in range(call_sites)
+    )
+    namespace = {}
+    exec(compile(source, "<leak-summary>", "exec"), namespace)
+    for _ in range(blocks_per_site):
+        namespace["leak"](malloc)
+
+    timer.restart()
+    mm.print_leak_summary()
+    return call_sites
+
+
+def run_workload(name, seed):
+    fn, params = WORKLOADS[name]
+    rng = random.Random(seed)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        timer = Timer()
+        operations = fn(rng, timer, **params)
+        printf_output.flush()
+        seconds = timer.elapsed()
+
+    return {
+        "params": params,
+        "operations": operations,
+        "seconds": seconds,
+        "ops_per_second": operations / seconds if seconds else 0,
+        # Kilobytes on Linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run(names=None, seed=0):
+    """
+    Runs the selected workloads (default: all), each in a fresh process.
+    Returns a dict of results by workload name.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names or WORKLOADS:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(run_workload, (name, seed))
+
+    return {
+        "seed": seed,
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{'workload':<34}{'ops/s':>14}{'peak RSS (KB)':>16}{'vs baseline':>14}")
+    for name, result in report["results"].items():
+        comparison = ""
+        if baseline and (previous := baseline["results"].get(name)):
+            if previous["ops_per_second"]:
+                ratio = result["ops_per_second"] / previous["ops_per_second"]
+                comparison = f"{ratio:.2f}x"
+        print(
+            f"{name:<34}{result['ops_per_second']:>14.0f}"
+            f"{result['peak_rss_kb']:>16}{comparison:>14}"
+        )
+
+
+def save(report, path):
+    with open(path, "w") as output:
+        json.dump(report, output, indent=2)
+
+
+def load(path):
+    with open(path) as baseline:
+        return json.load(baseline)
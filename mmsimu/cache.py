@@ -0,0 +1,265 @@
+"""
+Model of the CPU caches and TLB, fed by the memory accesses of the
+simulated program.
+
+CacheSimulator is an observer (see mmsimu.events): attach it with
+MemoryManager.add_observer, or run a program with `--cache`. Only the
+"full" and "sanitize" checking levels report accesses to observers.
+
+Every level is set-associative with LRU replacement, and counts hits and
+misses per call site. Cache levels see the misses of the level above
+them, the TLB sees every access. With the defaults, a row-major traversal
+of an int32_t matrix misses L1 once per 16 elements while a column-major
+one misses on almost every element.
+
+Accesses are buffered and simulated in batches. With NumPy, accesses are
+split into lines and consecutive accesses to the same line, which always
+hit, are counted at once; only the rest goes through the LRU sets one at
+a time.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from mmsimu.with_caller_info import call_sites, current_call_site
+
+
+class CacheLevel:
+    """
+    Set-associative cache of `size` bytes in lines of `line_size` bytes,
+    `ways` lines per set, with LRU replacement.
+    """
+
+    def __init__(self, name, size, line_size=64, ways=8):
+        n_sets, remainder = divmod(size, line_size * ways)
+        if n_sets == 0 or remainder or line_size & (line_size - 1):
+            raise Exception(
+                f"Invalid {name} geometry: {size} bytes is not a multiple of "
+                f"{ways} ways of {line_size} bytes, or the line size is not a "
+                f"power of two"
+            )
+
+        self.name = name
+        self.size = size
+        self.line_size = line_size
+        self.line_bits = line_size.bit_length() - 1
+        self.ways = ways
+        self.n_sets = n_sets
+        # Lines of each set, least recently used first
+        self.sets = [[] for _ in range(n_sets)]
+        self.last_line = None
+        self.hits = {}  # Call site id -> hits
+        self.misses = {}  # Call site id -> misses
+
+    def lookup(self, lines):
+        """
+        Accesses `lines` in order, updating the LRU state. Returns a list
+        with True for every hit.
+        """
+        sets, n_sets, ways = self.sets, self.n_sets, self.ways
+        last_line = self.last_line
+        hits = []
+        for line in lines:
+            if line == last_line:
+                # Already the most recently used line of its set
+                hits.append(True)
+                continue
+
+            lru = sets[line % n_sets]
+            if line in lru:
+                lru.remove(line)
+                lru.append(line)
+                hits.append(True)
+            else:
+                lru.append(line)
+                if len(lru) > ways:
+                    del lru[0]
+                hits.append(False)
+            last_line = line
+
+        self.last_line = last_line
+        return hits
+
+    def count(self, sites, hits):
+        for site, hit in zip(sites, hits):
+            counters = self.hits if hit else self.misses
+            counters[site] = counters.get(site, 0) + 1
+
+    def totals(self):
+        return _counters(sum(self.hits.values()), sum(self.misses.values()))
+
+
+def make_tlb(entries=64, page_size=4096, ways=4):
+    """
+    TLB with `entries` translations of `page_size` pages.
+    """
+    return CacheLevel("TLB", entries * page_size, line_size=page_size, ways=ways)
+
+
+def default_levels():
+    return [
+        CacheLevel("L1", 32 * 1024, line_size=64, ways=8),
+        CacheLevel("L2", 256 * 1024, line_size=64, ways=4),
+    ]
+
+
+class CacheSimulator:
+    """
+    Observer that runs every memory access through the cache `levels`
+    (default: 32 KiB 8-way L1 and 256 KiB 4-way L2 with 64 byte lines)
+    and `tlb`, a CacheLevel made with make_tlb. True uses the default TLB
+    (64 entries, 4-way, 4 KiB pages) and False none. All cache levels must
+    have the same line size.
+    """
+
+    def __init__(self, levels=None, tlb=True, batch_size=65536):
+        self.levels = levels or default_levels()
+        self.tlb = make_tlb() if tlb is True else tlb or None
+        if len({level.line_size for level in self.levels}) != 1:
+            raise Exception("Every cache level must have the same line size")
+
+        self.batch_size = batch_size
+        self.sites = []
+        self.addresses = []
+        self.sizes = []
+
+    def on_allocation(self, op, address, size, old_address, caller):
+        pass
+
+    def on_access(self, op, address, size):
+        self.sites.append(current_call_site().id)
+        self.addresses.append(address)
+        self.sizes.append(size)
+        if len(self.sites) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Simulates the buffered accesses.
+        """
+        if not self.sites:
+            return
+
+        batch = (self.sites, self.addresses, self.sizes)
+        self.sites, self.addresses, self.sizes = [], [], []
+        simulate = _simulate_arrays if numpy is not None else _simulate_lists
+        simulate(self.levels, *batch)
+        if self.tlb:
+            simulate([self.tlb], *batch)
+
+    def close(self):
+        self.flush()
+
+    def report(self):
+        """
+        Returns hits, misses and miss rates of every level, overall and per
+        call site. The miss rate of a level is over the accesses that reach
+        it.
+        """
+        self.flush()
+        levels = self.levels + ([self.tlb] if self.tlb else [])
+        site_ids = sorted(
+            {site for level in levels for site in (*level.hits, *level.misses)}
+        )
+        sites = call_sites()
+        return {
+            "levels": {level.name: level.totals() for level in levels},
+            "sites": [
+                {
+                    "site": str(sites[site]),
+                    **{
+                        level.name: _counters(
+                            level.hits.get(site, 0), level.misses.get(site, 0)
+                        )
+                        for level in levels
+                    },
+                }
+                for site in site_ids
+            ],
+        }
+
+    def print_report(self):
+        report = self.report()
+        names = list(report["levels"])
+        print()
+        print("======= CACHE SIMULATION =======")
+        for name, totals in report["levels"].items():
+            print(
+                f"{name}: {totals['hits']} hits, {totals['misses']} misses, "
+                f"miss rate {totals['miss_rate']:.3f}"
+            )
+        print()
+        print(f"{'site':<40}" + "".join(f"{name + ' miss rate':>16}" for name in names))
+        for site in sorted(report["sites"], key=lambda site: -site[names[0]]["misses"]):
+            print(
+                f"{site['site']:<40}"
+                + "".join(f"{site[name]['miss_rate']:>16.3f}" for name in names)
+            )
+        print("================================")
+
+
+def _counters(hits, misses):
+    return {
+        "hits": hits,
+        "misses": misses,
+        "miss_rate": misses / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+def _simulate_lists(levels, sites, addresses, sizes):
+    bits = levels[0].line_bits
+    lines = []
+    line_sites = []
+    for site, address, size in zip(sites, addresses, sizes):
+        for line in range(address >> bits, ((address + max(size, 1) - 1) >> bits) + 1):
+            lines.append(line)
+            line_sites.append(site)
+
+    for level in levels:
+        hits = level.lookup(lines)
+        level.count(line_sites, hits)
+        missed = [i for i, hit in enumerate(hits) if not hit]
+        lines = [lines[i] for i in missed]
+        line_sites = [line_sites[i] for i in missed]
+
+
+def _simulate_arrays(levels, sites, addresses, sizes):
+    bits = levels[0].line_bits
+    sites = numpy.array(sites, dtype=numpy.int64)
+    addresses = numpy.array(addresses, dtype=numpy.uint64)
+    sizes = numpy.maximum(numpy.array(sizes, dtype=numpy.uint64), 1)
+    first = addresses >> numpy.uint64(bits)
+    counts = ((addresses + sizes - numpy.uint64(1)) >> numpy.uint64(bits)) - first + 1
+    if (counts == 1).all():
+        lines = first
+    else:
+        # One element per line touched by each access
+        counts = counts.astype(numpy.int64)
+        starts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        lines = numpy.repeat(first, counts) + (
+            numpy.arange(counts.sum()) - starts
+        ).astype(numpy.uint64)
+        sites = numpy.repeat(sites, counts)
+
+    for level in levels:
+        if not len(lines):
+            return
+
+        # Accessing the line accessed right before always hits and leaves
+        # the LRU state as it was
+        repeated = numpy.empty(len(lines), dtype=bool)
+        repeated[0] = level.last_line is not None and lines[0] == level.last_line
+        numpy.equal(lines[1:], lines[:-1], out=repeated[1:])
+        hits = repeated.copy()
+        distinct = numpy.flatnonzero(~repeated)
+        hits[distinct] = level.lookup(lines[distinct].tolist())
+        level.last_line = int(lines[-1])
+
+        for counters, mask in ((level.hits, hits), (level.misses, ~hits)):
+            site_ids, counts = numpy.unique(sites[mask], return_counts=True)
+            for site, count in zip(site_ids.tolist(), counts.tolist()):
+                counters[site] = counters.get(site, 0) + count
+
+        lines, sites = lines[~hits], sites[~hits]
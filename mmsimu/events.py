@@ -0,0 +1,23 @@
+"""
+Operation codes shared by the simulator and its observers.
+
+Observers are attached with MemoryManager.add_observer and implement:
+
+    on_allocation(op, address, size, old_address, caller)
+        Called for malloc (MALLOC), realloc (REALLOC) and free (FREE), once
+        the block has been placed but before the live blocks and counters
+        of MemoryManager are updated: a freed block is still live, and a
+        new one is not yet. `address` is 0 if the allocation failed and
+        `old_address` is the block passed to realloc.
+
+    on_access(op, address, size)
+        Called before every READ or WRITE of `size` bytes at `address`.
+"""
+
+MALLOC = 1
+REALLOC = 2
+FREE = 3
+READ = 4
+WRITE = 5
+
+NAMES = {MALLOC: "malloc", REALLOC: "realloc", FREE: "free", READ: "read", WRITE: "write"}
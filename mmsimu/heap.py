@@ -0,0 +1,327 @@
+import mmap
+import random
+import weakref
+
+
+class Heap:
+    """
+    Contiguous storage shared by every allocation of a simulation.
+
+    Contents live in a single buffer. A second buffer of the same length
+    holds one flag per byte: 1 if the byte was written by the simulated
+    program, 0 if it still holds garbage.
+
+    Snapshots are copy-on-write: every method that modifies the buffers
+    first calls preserve(), which saves the original version of the pages
+    about to change in the snapshots that do not have them yet. The shadow
+    map of checks="sanitize", when there is one, is saved along with them
+    and follows the same backing as the contents. Array views
+    write to the buffers directly, so the spans of live views are saved
+    whenever a snapshot is taken or restored.
+
+    seed: Seed for the garbage returned by uninitialized reads. None picks
+          a different one on every run.
+    uninit_fill: What uninitialized bytes read as, one of UNINIT_FILLS:
+                 "random" garbage, "poison" (0xCD, like MSVC debug heaps)
+                 or "zero".
+    backing: Where the buffers live, one of BACKINGS: "memory" (bytearrays),
+             "mmap" (anonymous mappings, only the pages that are touched
+             take memory) or "file" (mappings of `path` and
+             `<path>.initialized`, which are kept after the simulation).
+    """
+
+    UNINIT_FILLS = ("random", "poison", "zero")
+    BACKINGS = ("memory", "mmap", "file")
+    POISON = 0xCD
+    PAGE_SIZE = 4096
+
+    def __init__(
+        self, size=0, seed=None, uninit_fill="random", backing="memory", path=None
+    ):
+        if uninit_fill not in self.UNINIT_FILLS:
+            raise Exception(
+                f"Unknown uninitialized memory fill `{uninit_fill}`, expected one of: {', '.join(self.UNINIT_FILLS)}"
+            )
+        if backing not in self.BACKINGS:
+            raise Exception(
+                f"Unknown heap backing `{backing}`, expected one of: {', '.join(self.BACKINGS)}"
+            )
+        if backing == "file" and path is None:
+            raise Exception("A file-backed heap needs the path of the heap file")
+
+        self.backing = backing
+        self.path = path if backing == "file" else None
+        self.files = []
+        flags_path = initialized_path(path) if self.path else None
+        self.memory = self._buffer(size, self.path)
+        self.initialized = self._buffer(size, flags_path)
+        self.random = random.Random(seed)
+        self.uninit_fill = uninit_fill
+        # See mmsimu.events
+        self.observers = []
+        # Weak references to the snapshots that can still be restored, oldest
+        # first. Unreachable snapshots stop costing anything on writes.
+        self.snapshots = []
+        # (weak reference, start, n_bytes) of the array views over the heap
+        self.views = []
+        # Shadow map of the blocks with checks="sanitize", see mmsimu.sanitizer
+        self.shadow = None
+        self.sanitizer = None
+
+    def _buffer(self, size, path):
+        if self.backing == "memory":
+            return bytearray(size)
+
+        if path is None:
+            file = None
+        else:
+            file = open(path, "w+b")
+            # Truncating leaves a sparse file, disk blocks are only used once written
+            file.truncate(size)
+            self.files.append(file)
+
+        if size == 0:
+            # Zero-length mappings are not allowed
+            return bytearray()
+        return mmap.mmap(-1 if file is None else file.fileno(), size)
+
+    def add_shadow(self):
+        """
+        Creates the shadow map: one byte per heap byte, all zero, with the
+        same kind of storage as the contents. A file-backed heap gets an
+        anonymous mapping: the shadow map is never written to the file.
+        """
+        self.shadow = self._buffer(self.size, None)
+        return self.shadow
+
+    def close(self):
+        """
+        Writes file-backed contents out and releases the mappings.
+        """
+        for buffer in (self.memory, self.initialized, self.shadow):
+            if isinstance(buffer, mmap.mmap):
+                buffer.flush()
+                try:
+                    buffer.close()
+                except BufferError:
+                    # An array view still exports it, it is unmapped once collected
+                    pass
+        for file in self.files:
+            file.close()
+        self.files = []
+
+    @property
+    def size(self):
+        return len(self.memory)
+
+    def snapshot(self):
+        snapshot = HeapSnapshot(self.random.getstate())
+        self.snapshots.append(weakref.ref(snapshot))
+        self._preserve_views()
+        return snapshot
+
+    def track_view(self, view, start, n_bytes):
+        """
+        Registers an array view over the span, which can be written without
+        going through the heap.
+        """
+        self.views.append((weakref.ref(view), start, n_bytes))
+
+    def _preserve_views(self):
+        self.views = [view for view in self.views if view[0]() is not None]
+        for _, start, n_bytes in self.views:
+            self.preserve(start, n_bytes)
+
+    def restore(self, snapshot):
+        """
+        Brings contents, initialization flags and the garbage generator back
+        to the moment `snapshot` was taken. Newer snapshots can no longer be
+        restored afterwards.
+        """
+        live = [ref() for ref in self.snapshots]
+        if snapshot not in live:
+            raise Exception(
+                "Snapshot can't be restored, an older one was restored since"
+            )
+
+        for newer in live[live.index(snapshot) + 1 :]:
+            if newer is not None:
+                newer.pages = None
+        del self.snapshots[live.index(snapshot) + 1 :]
+
+        # Any page written after the snapshot was taken is in snapshot.pages,
+        # and older snapshots already hold their own copy of it.
+        page_size = self.PAGE_SIZE
+        for page, (contents, flags, shadow) in snapshot.pages.items():
+            start = page * page_size
+            self.memory[start : start + len(contents)] = contents
+            self.initialized[start : start + len(flags)] = flags
+            if shadow is not None:
+                self.shadow[start : start + len(shadow)] = shadow
+        snapshot.pages = {}
+        self.random.setstate(snapshot.random_state)
+        self._preserve_views()
+
+    def preserve(self, start, n_bytes):
+        """
+        Saves the pages of the span in every snapshot that still needs them.
+        Must be called before modifying the span.
+
+        A snapshot that holds a page implies every older snapshot holds it
+        too, so for each page the newest snapshots are filled until one that
+        already has it is found.
+        """
+        if n_bytes <= 0:
+            return
+
+        snapshots = [s for ref in reversed(self.snapshots) if (s := ref()) is not None]
+        if len(snapshots) != len(self.snapshots):
+            self.snapshots = [weakref.ref(s) for s in reversed(snapshots)]
+        if not snapshots:
+            return
+
+        page_size = self.PAGE_SIZE
+        shadow = self.shadow
+        newest_pages = snapshots[0].pages
+        for page in range(start // page_size, (start + n_bytes - 1) // page_size + 1):
+            if page in newest_pages:
+                continue
+
+            page_start = page * page_size
+            page_end = page_start + page_size
+            saved = (
+                bytes(self.memory[page_start:page_end]),
+                bytes(self.initialized[page_start:page_end]),
+                None if shadow is None else bytes(shadow[page_start:page_end]),
+            )
+            for snapshot in snapshots:
+                if page in snapshot.pages:
+                    break
+                snapshot.pages[page] = saved
+
+    def notify_access(self, op, address, n_bytes):
+        for observer in self.observers:
+            observer.on_access(op, address, n_bytes)
+
+    def invalidate(self, start, n_bytes):
+        """
+        Marks the span as uninitialized, e.g. when it is handed out again.
+        """
+        end = start + n_bytes
+        flags = self.initialized
+        position = flags.find(b"\x01", start, end)
+        if position != -1 and self.snapshots:
+            self.preserve(position, end - position)
+        while position != -1:
+            # Clear a page at a time, so that mapped pages that were never
+            # written are not touched
+            page_end = min((position | (mmap.PAGESIZE - 1)) + 1, end)
+            flags[position:page_end] = bytes(page_end - position)
+            position = flags.find(b"\x01", page_end, end)
+
+    def read(self, start, n_bytes):
+        return bytes(self.memory[start : start + n_bytes])
+
+    def write(self, start, data):
+        if self.snapshots:
+            self.preserve(start, len(data))
+        end = start + len(data)
+        self.memory[start:end] = data
+        self.initialized[start:end] = b"\x01" * len(data)
+
+    def store(self, start, data):
+        """
+        Like write, but leaves the initialization flags alone.
+        """
+        if self.snapshots:
+            self.preserve(start, len(data))
+        self.memory[start : start + len(data)] = data
+
+    def fill(self, start, n_bytes, byte):
+        if self.snapshots:
+            self.preserve(start, n_bytes)
+        self.memory[start : start + n_bytes] = bytes([byte]) * n_bytes
+        self.initialized[start : start + n_bytes] = b"\x01" * n_bytes
+
+    def copy(self, destination, source, n_bytes):
+        """
+        Copies contents and initialization state between two spans. The
+        spans may overlap.
+        """
+        if self.snapshots:
+            self.preserve(destination, n_bytes)
+        self.memory[destination : destination + n_bytes] = self.memory[
+            source : source + n_bytes
+        ]
+        self.initialized[destination : destination + n_bytes] = self.initialized[
+            source : source + n_bytes
+        ]
+
+    def garbage(self, n_bytes):
+        if self.uninit_fill == "random":
+            return self.random.randbytes(n_bytes)
+        if self.uninit_fill == "poison":
+            return bytes([self.POISON]) * n_bytes
+        return bytes(n_bytes)
+
+    def fill_uninitialized(self, start, n_bytes, mark=True):
+        """
+        Replaces every uninitialized byte in the span with garbage and, if
+        `mark` is set, marks it as initialized so later reads return the
+        same value.
+
+        Returns True if any uninitialized byte was found.
+        """
+        end = start + n_bytes
+        flags = self.initialized
+        first = flags.find(b"\x00", start, end)
+        if first == -1:
+            return False
+
+        if self.snapshots:
+            self.preserve(first, end - first)
+        while first != -1:
+            last = flags.find(b"\x01", first, end)
+            if last == -1:
+                last = end
+            self.memory[first:last] = self.garbage(last - first)
+            if mark:
+                flags[first:last] = b"\x01" * (last - first)
+            first = flags.find(b"\x00", last, end)
+
+        return True
+
+    def mark_initialized(self, start, n_bytes):
+        """
+        Marks the span as initialized, keeping whatever it holds, e.g. the
+        garbage left by fill_uninitialized(mark=False).
+
+        Returns True if any byte of it was uninitialized.
+        """
+        end = start + n_bytes
+        first = self.initialized.find(b"\x00", start, end)
+        if first == -1:
+            return False
+
+        if self.snapshots:
+            self.preserve(first, end - first)
+        self.initialized[first:end] = b"\x01" * (end - first)
+        return True
+
+
+def initialized_path(path):
+    return f"{path}.initialized"
+
+
+class HeapSnapshot:
+    """
+    State of a heap at some point in time, see Heap.snapshot.
+
+    pages maps page numbers to their (contents, flags, shadow) at that
+    time, and only holds the pages that were modified since. shadow is None
+    if the heap has no shadow map.
+    """
+
+    def __init__(self, random_state):
+        self.pages = {}
+        self.random_state = random_state
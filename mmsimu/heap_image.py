@@ -0,0 +1,144 @@
+"""
+Post-mortem inspection of file-backed heaps.
+
+A simulation run with a heap file leaves three files behind:
+
+    <heap>              Contents of the simulated heap
+    <heap>.initialized  One byte per heap byte, 1 if the program wrote it
+    <heap>.json         Metadata: live blocks, their call sites and, if the
+                        program crashed, the error that stopped it
+
+The metadata is written when the simulation ends, whether the program
+returned or failed.
+"""
+
+import json
+import mmap
+import traceback
+
+from mmsimu.heap import initialized_path
+
+
+def metadata_path(heap_path):
+    return f"{heap_path}.json"
+
+
+def save_metadata(mm, error=None):
+    """
+    Writes the metadata of the file-backed heap of `mm`. `error` is the
+    exception that stopped the simulated program, if any.
+    """
+    metadata = {
+        "heap_size": mm.heap_size,
+        "base_address": mm.base_brk,
+        "policy": mm.policy,
+        "uninit_fill": mm.heap.uninit_fill,
+        "stats": mm.heap_stats(),
+        "blocks": [
+            {
+                "address": allocation.address,
+                "offset": allocation.offset,
+                "size": allocation.size,
+                "allocated_at": str(allocation.allocated_at),
+            }
+            for allocation in mm.allocations
+        ],
+        "error": None,
+    }
+    if error is not None:
+        metadata["error"] = {
+            "type": type(error).__name__,
+            "message": str(error),
+            "traceback": traceback.format_exception(error),
+        }
+
+    with open(metadata_path(mm.heap.path), "w") as metadata_file:
+        json.dump(metadata, metadata_file, indent=2)
+
+
+class HeapImage:
+    """
+    Read-only view of a heap left by a previous simulation.
+    """
+
+    def __init__(self, path):
+        with open(metadata_path(path)) as metadata_file:
+            self.metadata = json.load(metadata_file)
+        self.memory = _map_read_only(path)
+        self.initialized = _map_read_only(initialized_path(path))
+
+    def block(self, address):
+        """
+        Returns the metadata of the live block containing `address`, or None.
+        """
+        for block in self.metadata["blocks"]:
+            if block["address"] <= address < block["address"] + max(block["size"], 1):
+                return block
+
+        return None
+
+    def dump(self, address, n_bytes, width=16):
+        """
+        Hex dump of `n_bytes` starting at `address`. Uninitialized bytes are
+        shown as `??`.
+        """
+        offset = address - self.metadata["base_address"]
+        assert (
+            0 <= offset and offset + n_bytes <= self.metadata["heap_size"]
+        ), f"0x{address:x}+{n_bytes} is outside of the heap"
+
+        lines = []
+        for line_start in range(offset, offset + n_bytes, width):
+            line_end = min(line_start + width, offset + n_bytes)
+            cells = [
+                f"{self.memory[i]:02x}" if self.initialized[i] else "??"
+                for i in range(line_start, line_end)
+            ]
+            lines.append(
+                f"0x{self.metadata['base_address'] + line_start:x}  {' '.join(cells)}"
+            )
+
+        return "\n".join(lines)
+
+
+def _map_read_only(path):
+    with open(path, "rb") as file:
+        if file.seek(0, 2) == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def print_inspection(image, address=None, n_bytes=64):
+    metadata = image.metadata
+    stats = metadata["stats"]
+    print(
+        f"Heap of {metadata['heap_size']} bytes at 0x{metadata['base_address']:x} "
+        f"({metadata['policy']})"
+    )
+    print(
+        f"{stats['in_use']} bytes in use in {stats['live_blocks']} blocks, "
+        f"peak {stats['peak_in_use']}"
+    )
+    if error := metadata["error"]:
+        print()
+        print(f"The program stopped with {error['type']}: {error['message']}")
+        print("".join(error["traceback"]), end="")
+
+    if address is None:
+        print()
+        for block in metadata["blocks"]:
+            print(
+                f"0x{block['address']:x}  {block['size']:>10} bytes  "
+                f"allocated at {block['allocated_at']}"
+            )
+        return
+
+    print()
+    if block := image.block(address):
+        print(
+            f"0x{address:x} is {address - block['address']} bytes inside a block of "
+            f"{block['size']} bytes allocated at {block['allocated_at']}"
+        )
+    else:
+        print(f"0x{address:x} is not inside a live block")
+    print(image.dump(address, n_bytes))
@@ -0,0 +1,116 @@
+"""
+Renders an overview of the heap as a fixed-width strip.
+
+The heap is split in `width` buckets of equal size and every bucket shows
+how much of it is in use, so the output size does not depend on the heap
+size or on the number of blocks.
+"""
+
+from html import escape
+
+
+# Text shades, from a free bucket to a fully used one
+SHADES = ".:-=+*#%@"
+
+
+def _bucket_start(bucket, heap_size, width):
+    # Buckets differ in size by at most one byte when width does not divide
+    # heap_size
+    return -(-bucket * heap_size // width)
+
+
+def bucket_usage(regions, heap_size, width):
+    """
+    Aggregates (offset, size, owner) regions into `width` buckets. Free
+    regions have no owner. Returns one (used_bytes, owners, size) tuple per
+    bucket, where owners maps each owner to its bytes in that bucket.
+    """
+    width = max(1, min(width, heap_size))
+    starts = [_bucket_start(b, heap_size, width) for b in range(width + 1)]
+    used = [0] * width
+    owners = [{} for _ in range(width)]
+    for offset, size, owner in regions:
+        if owner is None or size == 0:
+            continue
+
+        end = offset + size
+        first = offset * width // heap_size
+        last = (end - 1) * width // heap_size
+        for bucket in range(first, last + 1):
+            overlap = min(end, starts[bucket + 1]) - max(offset, starts[bucket])
+            used[bucket] += overlap
+            owners[bucket][owner] = owners[bucket].get(owner, 0) + overlap
+
+    return [(used[b], owners[b], starts[b + 1] - starts[b]) for b in range(width)]
+
+
+def render_text(summary, buckets):
+    strip = "".join(
+        SHADES[-(-used * (len(SHADES) - 1) // size)] for used, _, size in buckets
+    )
+    lines = [
+        f"|{strip}|",
+        f"{summary['heap_size']} bytes, {len(buckets)} buckets of "
+        f"~{summary['heap_size'] // len(buckets)} bytes ('{SHADES[0]}' free, "
+        f"'{SHADES[-1]}' full)",
+        f"in use: {summary['in_use']} bytes in {summary['live_blocks']} blocks",
+        f"free: {summary['free_bytes']} bytes in {summary['free_blocks']} blocks, "
+        f"largest {summary['largest_free_block']}",
+        f"external fragmentation: {summary['external_fragmentation']:.3f}",
+        "free blocks by size:",
+    ]
+    for low, high, count in summary["free_histogram"]:
+        lines.append(f"  {low:>10} - {high:<10} {count}")
+
+    return "\n".join(lines)
+
+
+def render_svg(summary, buckets, bucket_width=4, height=32):
+    rects = []
+    for index, (used, owners, size) in enumerate(buckets):
+        title = f"{used} of {size} bytes in use"
+        if owners:
+            owner = max(owners, key=owners.get)
+            title += f", mostly allocated at {owner}"
+        rects.append(
+            f'<rect x="{index * bucket_width}" y="0" width="{bucket_width}" '
+            f'height="{height}" fill="#c0392b" fill-opacity="{used / size:.3f}">'
+            f"<title>{escape(title)}</title></rect>"
+        )
+
+    total_width = len(buckets) * bucket_width
+    caption = (
+        f"{summary['in_use']} of {summary['heap_size']} bytes in use, largest free "
+        f"block {summary['largest_free_block']}, external fragmentation "
+        f"{summary['external_fragmentation']:.3f}"
+    )
+    return "\n".join(
+        [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{total_width}" '
+            f'height="{height + 20}" font-family="monospace" font-size="12">',
+            f'<rect x="0" y="0" width="{total_width}" height="{height}" '
+            f'fill="none" stroke="#333"/>',
+            *rects,
+            f'<text x="0" y="{height + 15}">{escape(caption)}</text>',
+            "</svg>",
+        ]
+    )
+
+
+RENDERERS = {"text": render_text, "svg": render_svg}
+
+
+def render(summary, regions, width=64, format="text"):
+    """
+    Renders the output of MemoryManager.heap_map and heap_regions.
+    """
+    if format not in RENDERERS:
+        raise Exception(
+            f"Unknown heap map format `{format}`, expected one of: {', '.join(RENDERERS)}"
+        )
+    if summary["heap_size"] == 0:
+        return "(empty heap)"
+
+    return RENDERERS[format](
+        summary, bucket_usage(regions, summary["heap_size"], width)
+    )
@@ -1,11 +1,50 @@
-_global_heap_instance = None
+import contextlib
+import contextvars
+
+
+# Each thread and asyncio task sees the instance set in its own context, so
+# independent simulations can run side by side in one process
+_current_instance = contextvars.ContextVar("mmsimu_instance", default=None)
+# Used by contexts that did not set their own, e.g. threads started by the
+# simulated program
+_default_instance = None
 
 
 def set_instance(instance):
-    global _global_heap_instance
+    """
+    Makes `instance` the simulator used by the builtins of mmsimu.all in the
+    current context, and in every thread or context that has none of its
+    own. Asyncio tasks created afterwards inherit it.
+    """
+    global _default_instance
 
-    _global_heap_instance = instance
+    _default_instance = instance
+    _current_instance.set(instance)
 
 
 def get_instance():
-    return _global_heap_instance
+    instance = _current_instance.get()
+    if instance is None:
+        instance = _default_instance
+        if instance is None:
+            raise Exception(
+                "No simulator instance in this thread or context -- call "
+                "mmsimu_init, set_instance or use_instance first"
+            )
+    return instance
+
+
+@contextlib.contextmanager
+def use_instance(instance):
+    """
+    Uses `instance` as the simulator for the duration of a with block, only
+    in the current context:
+
+        with use_instance(MemoryManager(1024)) as mm:
+            p = malloc(16)
+    """
+    token = _current_instance.set(instance)
+    try:
+        yield instance
+    finally:
+        _current_instance.reset(token)
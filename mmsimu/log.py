@@ -1,13 +1,88 @@
+import json
 import logging
+from collections import deque
 
 
 logging.basicConfig(format="%(message)s")
 logger = logging.getLogger("mmsimu")
 
 
-def alloc(message):
-    logger.getChild("alloc").info(message)
+class Channel:
+    """
+    Stream of simulator events of one kind.
 
+    Events are dicts of raw fields (op, size, address, caller, ...) handed
+    to every sink of the channel. Callers check `enabled` before building
+    an event, so a channel without sinks costs a single branch:
 
-def uninit(message):
-    logger.getChild("uninit").info(message)
+        if log.alloc.enabled:
+            log.alloc.emit("free", size=size, address=address, caller=caller)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.sinks = []
+        self.enabled = False
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self.enabled = True
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks.remove(sink)
+        self.enabled = bool(self.sinks)
+
+    def emit(self, op, **fields):
+        event = {"channel": self.name, "op": op, **fields}
+        for sink in self.sinks:
+            sink(event)
+
+
+class TextSink:
+    """
+    Writes events as human readable messages through the `mmsimu` logger.
+    """
+
+    MESSAGES = {
+        "malloc": "[{caller}] Requested {size} bytes",
+        "out_of_memory": "[{caller}] Not enough memory (in use: {in_use}, heap size: {heap_size})",
+        "realloc": "[{caller}] Reallocating block of size {old_size} to {size} bytes",
+        "free": "[{caller}] Freed {size} bytes",
+        "uninit_read": "[WARNING] Reading uninitialized memory",
+    }
+
+    def __init__(self, channel):
+        self.logger = logger.getChild(channel)
+        self.logger.setLevel(logging.INFO)
+
+    def __call__(self, event):
+        self.logger.info(self.MESSAGES[event["op"]].format(**event))
+
+
+class JsonLinesSink:
+    """
+    Writes one JSON object per event to a text file.
+    """
+
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event, default=str) + "\n")
+
+
+class RingBufferSink:
+    """
+    Keeps the last `capacity` events in memory.
+    """
+
+    def __init__(self, capacity=1024):
+        self.events = deque(maxlen=capacity)
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+alloc = Channel("alloc")
+uninit = Channel("uninit")
@@ -1,25 +1,188 @@
-import logging
+import argparse
 import sys
+import time
 
-from mmsimu.log import logger
-from mmsimu.memory_manager import MemoryManager
+from mmsimu import log
+from mmsimu.heap import Heap
+from mmsimu.heap_image import save_metadata
+from mmsimu.memory_manager import (
+    ALLOCATION_POLICIES,
+    CHECK_LEVELS,
+    REALLOC_MODES,
+    MemoryManager,
+)
+from mmsimu.printf import BufferedWriter
 from mmsimu.instance import set_instance
+from mmsimu.trace import TraceRecorder
+from mmsimu.with_caller_info import caller_info_mode, set_caller_info_mode
 
 
-def mmsimu_init(main_function, heap_size=1024):
+def mmsimu_init(
+    main_function,
+    heap_size=1024,
+    policy="first-fit",
+    caller_info="line",
+    caller_stack_depth=8,
+    trace=None,
+    seed=None,
+    uninit_fill="random",
+    heap_backing="memory",
+    heap_file=None,
+    checks="full",
+    redzone=16,
+    quarantine_bytes=1 << 20,
+    realloc_mode="move",
+    cache=False,
+    profile=None,
+):
     """
     Starts the simulated memory manager and runs the main_function.
 
-    heap_size: Maximum heap size in bytes. If the result of an
-               allocation would make the total allocated bytes
-               exceed this value, the allocation will fail.
+    heap_size: Heap size in bytes. If no free block of the heap is large
+               enough for a request, the allocation will fail. Also set by
+               `--heap-size N`.
+    policy: Placement policy of the allocator: "first-fit", "best-fit",
+            "segregated-fit" or "buddy". Also set by `--policy`.
+    caller_info: What is recorded about the caller of malloc, realloc and
+                 free: "off", "line" (function and line) or "stack" (up to
+                 caller_stack_depth frames).
+    trace: Path of a file where every allocation and memory access is
+           recorded, see mmsimu.trace. Also set by `--trace FILE`.
+    seed: Seed for the garbage read from uninitialized memory. Also set by
+          `--seed N`. None picks a different one every run.
+    uninit_fill: What uninitialized memory reads as: "random", "poison"
+                 (0xCD bytes) or "zero". Also set by `--uninit-fill`.
+    heap_backing: Storage of the heap: "memory", or "mmap" for heaps of
+                  GBs where only the touched pages take memory. Also set by
+                  `--heap-backing`.
+    heap_file: Path of a file to map the heap to. The heap image and its
+               metadata are kept after the program ends or crashes, see
+               `python -m mmsimu inspect`. Also set by `--heap-file FILE`.
+    checks: What is checked on each memory access: "full", "bounds",
+            "accounting" (nothing, for fast leak accounting on trusted
+            programs) or "sanitize" (full checks plus redzones and a
+            quarantine of freed blocks). Also set by `--checks`.
+    redzone: Bytes of redzone around each block with checks="sanitize".
+             Also set by `--redzone N`.
+    quarantine_bytes: Most bytes of freed blocks kept in quarantine with
+                      checks="sanitize". Also set by `--quarantine-bytes N`.
+    realloc_mode: "move" (realloc always moves the block, to catch uses of
+                  the old pointer) or "in-place" (blocks grow and shrink
+                  where they are when possible). Also set by `--realloc`.
+    cache: Runs every memory access through a model of the CPU caches and
+           TLB and prints hits and misses per call site at the end. True
+           uses the default model, or pass a mmsimu.cache.CacheSimulator.
+           Also set by `--cache`.
+    profile: Path of a collapsed-stack file (for flamegraphs) with the
+             simulated cycles of every call site. A report of the hot spots
+             is printed at the end. Also set by `--profile FILE`, see
+             mmsimu.profiler.
+
+    `--report FILE` writes a JSON summary of the run (leaks, the error that
+    stopped the program, peak memory and runtime), see mmsimu.batch.
+    """
+    args = parse_arguments()
+    heap_size = args.heap_size if args.heap_size is not None else heap_size
+    policy = args.policy or policy
+    checks = args.checks or checks
+    redzone = args.redzone if args.redzone is not None else redzone
+    if args.quarantine_bytes is not None:
+        quarantine_bytes = args.quarantine_bytes
+    realloc_mode = args.realloc or realloc_mode
+    trace = args.trace or trace
+    cache = args.cache or cache
+    profile = args.profile or profile
+    seed = args.seed if args.seed is not None else seed
+    uninit_fill = args.uninit_fill or uninit_fill
+    heap_backing = args.heap_backing or heap_backing
+    heap_file = args.heap_file or heap_file
+    if heap_file:
+        heap_backing = "file"
+
+    mm = MemoryManager(
+        heap_size,
+        policy=policy,
+        seed=seed,
+        uninit_fill=uninit_fill,
+        backing=heap_backing,
+        heap_file=heap_file,
+        checks=checks,
+        redzone=redzone,
+        quarantine_bytes=quarantine_bytes,
+        realloc_mode=realloc_mode,
+        stdout=BufferedWriter(),
+    )
+    # Also the instance of the threads the program starts
+    set_instance(mm)
+    with mm:
+        recorder = mm.add_observer(TraceRecorder(trace)) if trace else None
+        if cache is True:
+            from mmsimu.cache import CacheSimulator
+
+            cache = CacheSimulator()
+        if cache:
+            mm.add_observer(cache)
+        profiler = mm.start_profiling() if profile else None
+        # Process-wide settings, put back once the program ends so that
+        # later simulations start from a clean state
+        previous_caller_info = caller_info_mode()
+        set_caller_info_mode(caller_info, caller_stack_depth)
+        sinks = []
+        if args.log_alloc:
+            sinks.append((log.alloc, log.alloc.add_sink(log.TextSink("alloc"))))
+        if args.log_uninit:
+            sinks.append((log.uninit, log.uninit.add_sink(log.TextSink("uninit"))))
+        error = None
+        start = time.perf_counter()
+        try:
+            main_function()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            # Output printed so far goes before the leak summary or traceback
+            mm.stdout.flush()
+            for channel, sink in sinks:
+                channel.remove_sink(sink)
+            set_caller_info_mode(*previous_caller_info)
+            if recorder:
+                recorder.close()
+            if cache:
+                cache.print_report()
+            if profiler:
+                profiler.print_report()
+                profiler.save_collapsed_stacks(profile)
+            if heap_file:
+                save_metadata(mm, error)
+            if args.report:
+                from mmsimu.batch import save_report
+
+                save_report(args.report, mm, error, seconds)
+            mm.heap.close()
+
+
+def parse_arguments(argv=None):
+    """
+    Parses the simulator options from the command line of the simulated
+    program. Unknown arguments are left for the program itself.
     """
-    for arg in sys.argv[1:]:
-        if arg == "--log-alloc":
-            logger.getChild("alloc").setLevel(logging.INFO)
-        if arg == "--log-uninit":
-            logger.getChild("uninit").setLevel(logging.INFO)
-
-    with MemoryManager(heap_size) as mm:
-        set_instance(mm)
-        main_function()
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--log-alloc", action="store_true")
+    parser.add_argument("--log-uninit", action="store_true")
+    parser.add_argument("--heap-size", type=int)
+    parser.add_argument("--policy", choices=list(ALLOCATION_POLICIES))
+    parser.add_argument("--checks", choices=list(CHECK_LEVELS))
+    parser.add_argument("--redzone", type=int)
+    parser.add_argument("--quarantine-bytes", type=int)
+    parser.add_argument("--realloc", choices=REALLOC_MODES)
+    parser.add_argument("--trace", metavar="FILE")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--profile", metavar="FILE")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--uninit-fill", choices=Heap.UNINIT_FILLS)
+    parser.add_argument("--heap-backing", choices=("memory", "mmap"))
+    parser.add_argument("--heap-file", metavar="FILE")
+    parser.add_argument("--report", metavar="FILE")
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args
@@ -1,91 +1,605 @@
-from mmsimu import log
-from mmsimu.allocation import Allocation
-from mmsimu.types.integer import IntType
-from mmsimu.types.character import CharType
+import copy
+import heapq
+
+from mmsimu import heap_map, log
+from mmsimu.address_index import AddressIndex
+from mmsimu.allocation import (
+    Allocation,
+    BoundsCheckedAllocation,
+    NULL,
+    UncheckedAllocation,
+)
+from mmsimu.allocators.best_fit import BestFitAllocator
+from mmsimu.allocators.buddy import BuddyAllocator
+from mmsimu.allocators.first_fit import FirstFitAllocator
+from mmsimu.events import MALLOC, REALLOC, FREE, READ, WRITE
+from mmsimu.allocators.segregated_fit import SegregatedFitAllocator
+from mmsimu.heap import Heap
+from mmsimu.printf import stdout as shared_stdout
+from mmsimu.profiler import Profiler
+from mmsimu.sanitizer import SanitizedAllocation, Sanitizer
+from mmsimu.snapshot import Snapshot
+from mmsimu.stats import CallSiteStats
+from mmsimu.value import Value
 from mmsimu.with_caller_info import with_caller_info
 
 
+ALLOCATION_POLICIES = {
+    "first-fit": FirstFitAllocator,
+    "best-fit": BestFitAllocator,
+    "segregated-fit": SegregatedFitAllocator,
+    "buddy": BuddyAllocator,
+}
+
+CHECK_LEVELS = {
+    "full": Allocation,
+    "bounds": BoundsCheckedAllocation,
+    "accounting": UncheckedAllocation,
+    "sanitize": SanitizedAllocation,
+}
+
+REALLOC_MODES = ("move", "in-place")
+
+
 class MemoryManager:
-    def __init__(self, heap_size, base_brk=0x0000_55D9_0000_0000):
+    def __init__(
+        self,
+        heap_size,
+        base_brk=0x0000_55D9_0000_0000,
+        policy="first-fit",
+        seed=None,
+        uninit_fill="random",
+        backing="memory",
+        heap_file=None,
+        checks="full",
+        redzone=16,
+        quarantine_bytes=1 << 20,
+        realloc_mode="move",
+        stdout=None,
+    ):
         """
-        heap_size: Maximum heap size in bytes. If the result of an
-                   allocation would make the total allocated bytes
-                   exceed this value, the allocation will fail.
+        heap_size: Heap size in bytes. Blocks are placed inside this many
+                   bytes; if no free block is large enough for a request,
+                   the allocation will fail.
         base_brk: Base address for allocated memory. This value is just
                   so that the simulated application can print pointers that
                   look "real". Any value can be used as it's not really
                   relevant to the simulation.
+        policy: Placement policy used to pick a free block for each
+                allocation. One of the keys of ALLOCATION_POLICIES.
+        seed: Seed for the garbage read from uninitialized memory, so runs
+              can be reproduced. None picks a different one every run.
+        uninit_fill: What uninitialized memory reads as: "random",
+                     "poison" (0xCD bytes) or "zero".
+        backing: Storage of the heap contents: "memory", "mmap" or "file".
+                 See Heap.
+        heap_file: Path of the heap image when backing is "file".
+        checks: What is checked on every access to a block, one of the keys
+                of CHECK_LEVELS: "full", "bounds" (only bounds) or
+                "accounting" (nothing, only allocations are tracked).
+                "sanitize" adds redzones around blocks and a quarantine of
+                freed blocks, see mmsimu.sanitizer.
+        redzone: Bytes of redzone on each side of every block with
+                 checks="sanitize".
+        quarantine_bytes: Most bytes of freed blocks kept away from the
+                          allocator with checks="sanitize". The oldest ones
+                          are reused first.
+        realloc_mode: "move" always moves reallocated blocks, so that code
+                      that keeps using the old pointer fails. "in-place"
+                      resizes blocks where they are when the space after
+                      them is free, and always shrinks them in place.
+        stdout: mmsimu.printf.BufferedWriter that printf writes to. None
+                uses the one shared by the process, flushed at exit.
         """
+        if policy not in ALLOCATION_POLICIES:
+            raise Exception(
+                f"Unknown allocation policy `{policy}`, expected one of: {', '.join(ALLOCATION_POLICIES)}"
+            )
+        if checks not in CHECK_LEVELS:
+            raise Exception(
+                f"Unknown checking level `{checks}`, expected one of: {', '.join(CHECK_LEVELS)}"
+            )
+        if realloc_mode not in REALLOC_MODES:
+            raise Exception(
+                f"Unknown realloc mode `{realloc_mode}`, expected one of: {', '.join(REALLOC_MODES)}"
+            )
+
         self.currently_allocated = 0
-        self.allocations = []
+        self.peak_allocated = 0
+        # Work done by realloc: bytes copied to a new block, and bytes added
+        # to blocks resized in place
+        self.realloc_bytes_copied = 0
+        self.realloc_bytes_grown_in_place = 0
+        self.site_stats = {}  # Call site -> CallSiteStats
+        self.allocations = AddressIndex()
         self.heap_size = heap_size
-        self.brk = base_brk
+        self.heap = Heap(
+            heap_size,
+            seed=seed,
+            uninit_fill=uninit_fill,
+            backing=backing,
+            path=heap_file,
+        )
+        self.policy = policy
+        self.realloc_mode = realloc_mode
+        self.allocation_class = CHECK_LEVELS[checks]
+        self.allocator = ALLOCATION_POLICIES[policy](heap_size)
+        self.base_brk = base_brk
+        self.stdout = shared_stdout if stdout is None else stdout
+        self.sanitizer = None
+        self.redzone = 0  # Bytes between the allocator block and the allocation
+        if checks == "sanitize":
+            self.sanitizer = Sanitizer(self.heap, redzone, quarantine_bytes)
+            self.redzone = redzone
+        self.heap.sanitizer = self.sanitizer
+
+    @property
+    def observers(self):
+        return self.heap.observers
+
+    def add_observer(self, observer):
+        """
+        Attaches an observer of allocations and memory accesses, see
+        mmsimu.events.
+        """
+        self.heap.observers.append(observer)
+        return observer
+
+    def remove_observer(self, observer):
+        self.heap.observers.remove(observer)
+
+    def start_profiling(self, costs=None):
+        """
+        Attaches a Profiler that charges simulated cycles, from the CostModel
+        `costs`, to the call site of every operation. Returns it, see
+        mmsimu.profiler.
+        """
+        return self.add_observer(Profiler(costs))
+
+    @property
+    def brk(self):
+        return self.base_brk + self.allocator.top
 
     def malloc(self, size, caller):
-        log.alloc(f"[{caller}] Requested {size} bytes")
-        if self.currently_allocated + size > self.heap_size:
-            log.alloc(
-                f"[{caller}] Not enough memory (in use: {self.currently_allocated}, heap size: {self.heap_size})"
+        allocation = self._new_allocation(size, caller)
+        if log.alloc.enabled:
+            log.alloc.emit(
+                "malloc",
+                size=size,
+                address=allocation.address if allocation else NULL,
+                caller=caller,
             )
+        if self.observers:
+            self._notify(MALLOC, allocation, size, NULL, caller)
+        if allocation is None:
+            self._log_out_of_memory(size, caller)
             return Allocation(caller, 0, 0, None)
 
-        allocation = Allocation(caller, size, address=self.brk)
-        self.allocations.append(allocation)
-        self.brk += size
-        self.currently_allocated += size
+        self._account(allocation)
         return allocation
 
     def realloc(self, allocation, size, caller):
-        old_allocation = allocation.into_allocation()
-        log.alloc(
-            f"[{caller}] Reallocating block of size {old_allocation.size} to {size} bytes"
-        )
+        if int(allocation) == NULL:
+            return self.malloc(size, caller)
+
+        old_allocation = self._live_allocation(allocation, "realloc")
+        if self.realloc_mode == "in-place" and self._resize_in_place(
+            old_allocation, size, caller
+        ):
+            return old_allocation
 
-        # We'll always move the memory somewhere else to prevent bugs of reusing
-        # the old allocation / not checking realloc results.
-        new_allocation = Allocation(
-            caller, size, address=self.brk, old_contents=old_allocation.bytes[:]
+        # In "move" mode the memory always goes somewhere else, to find bugs of
+        # reusing the old allocation / not checking realloc results.
+        new_allocation = self._new_allocation(size, caller)
+        if log.alloc.enabled:
+            log.alloc.emit(
+                "realloc",
+                old_size=old_allocation.size,
+                size=size,
+                old_address=old_allocation.address,
+                address=new_allocation.address if new_allocation else NULL,
+                caller=caller,
+            )
+        if self.observers:
+            self._notify(REALLOC, new_allocation, size, old_allocation.address, caller)
+        if new_allocation is None:
+            # Just like C, the old block is left untouched
+            self._log_out_of_memory(size, caller)
+            return Allocation(caller, 0, 0, None)
+
+        self.heap.copy(
+            new_allocation.offset,
+            old_allocation.offset,
+            min(old_allocation.size, size),
         )
-        self.free(old_allocation, caller)
-        self.allocations.append(new_allocation)
-        self.brk += size
-        self.currently_allocated += size
+        self.realloc_bytes_copied += min(old_allocation.size, size)
+        self._release(old_allocation, caller)
+        self._account(new_allocation)
         return new_allocation
 
+    def _resize_in_place(self, allocation, size, caller):
+        """
+        Resizes `allocation` without moving it, if the allocator can. The
+        block then counts as allocated again, by `caller`.
+        """
+        block_offset = allocation.offset - self.redzone
+        old_block_size = self.allocator.block_size(block_offset)
+        top = self.allocator.top
+        if not self.allocator.resize(block_offset, size + 2 * self.redzone):
+            return False
+
+        old_size = allocation.size
+        if size > old_size:
+            self.realloc_bytes_grown_in_place += size - old_size
+            if allocation.tracks_initialization:
+                # Memory above the old top was never handed out, so it holds no flags
+                end = allocation.offset + old_size
+                self.heap.invalidate(end, min(size - old_size, max(top - end, 0)))
+
+        self.currently_allocated -= old_size
+        self.allocations.remove(allocation)
+        self.site_stats[allocation.allocated_at].freed(old_size)
+        allocation.allocated_at = caller
+        allocation.size = size
+        if self.sanitizer:
+            self.sanitizer.resized(
+                allocation,
+                old_size,
+                block_offset,
+                self.allocator.block_size(block_offset),
+                old_block_size,
+            )
+        if log.alloc.enabled:
+            log.alloc.emit(
+                "realloc",
+                old_size=old_size,
+                size=size,
+                old_address=allocation.address,
+                address=allocation.address,
+                caller=caller,
+            )
+        if self.observers:
+            self._notify(REALLOC, allocation, size, allocation.address, caller)
+
+        self._account(allocation)
+        return True
+
+    def _new_allocation(self, size, caller):
+        top = self.allocator.top
+        block_offset = self.allocator.allocate(size + 2 * self.redzone)
+        if block_offset is None and self.sanitizer and self.sanitizer.quarantine:
+            # Reusing freed blocks early beats failing an allocation C would not
+            for released in self.sanitizer.drain():
+                self.allocator.free(released)
+            top = self.allocator.top
+            block_offset = self.allocator.allocate(size + 2 * self.redzone)
+        if block_offset is None:
+            return None
+
+        offset = block_offset + self.redzone
+        if self.allocation_class.tracks_initialization:
+            # Memory above the old top was never handed out, so it holds no flags
+            self.heap.invalidate(offset, min(size, max(top - offset, 0)))
+        allocation = self.allocation_class(
+            caller,
+            size,
+            address=self.base_brk + offset,
+            heap=self.heap,
+            offset=offset,
+        )
+        if self.sanitizer:
+            self.sanitizer.allocated(
+                allocation, block_offset, self.allocator.block_size(block_offset)
+            )
+        return allocation
+
+    def _account(self, allocation):
+        self.allocations.add(allocation)
+        self.currently_allocated += allocation.size
+        if self.currently_allocated > self.peak_allocated:
+            self.peak_allocated = self.currently_allocated
+
+        site = allocation.allocated_at
+        if (stats := self.site_stats.get(site)) is None:
+            stats = self.site_stats[site] = CallSiteStats(site)
+        stats.allocated(allocation.size)
+
+    def _notify(self, op, allocation, size, old_address, caller):
+        address = allocation.address if allocation else NULL
+        for observer in self.observers:
+            observer.on_allocation(op, address, size, old_address, caller)
+
+    def _log_out_of_memory(self, size, caller):
+        if log.alloc.enabled:
+            log.alloc.emit(
+                "out_of_memory",
+                size=size,
+                caller=caller,
+                in_use=self.currently_allocated,
+                heap_size=self.heap_size,
+            )
+
     def free(self, obj, caller):
-        allocation = obj.into_allocation()
+        if int(obj) == NULL:
+            # free(NULL) does nothing
+            return
+
+        allocation = self._live_allocation(obj, "free")
+        if self.observers:
+            self._notify(FREE, allocation, allocation.size, NULL, caller)
+        self._release(allocation, caller)
+
+    def _release(self, allocation, caller):
         allocation.mark_freed()
+        block_offset = allocation.offset - self.redzone
+        if self.sanitizer:
+            # The block is only reused once it leaves the quarantine
+            block_size = self.allocator.block_size(block_offset)
+            for released in self.sanitizer.freed(
+                allocation, caller, block_offset, block_size
+            ):
+                self.allocator.free(released)
+        else:
+            self.allocator.free(block_offset)
         self.currently_allocated -= allocation.size
         self.allocations.remove(allocation)
-        log.alloc(f"[{caller}] Freed {allocation.size} bytes")
+        self.site_stats[allocation.allocated_at].freed(allocation.size)
+        if log.alloc.enabled:
+            log.alloc.emit(
+                "free", size=allocation.size, address=allocation.address, caller=caller
+            )
+
+    def calloc(self, count, size, caller):
+        if count * size >= 1 << 64:
+            # count * size would overflow size_t
+            return self.malloc(1 << 64, caller)
+
+        allocation = self.malloc(count * size, caller)
+        if allocation != NULL:
+            self.heap.fill(allocation.offset, allocation.size, 0)
+        return allocation
+
+    def memcpy(self, destination, source, n_bytes, caller):
+        """
+        Copies `n_bytes` from `source` to `destination`, which must not
+        overlap. Uninitialized bytes are copied as uninitialized, so reading
+        them from the destination is still reported.
+        """
+        return self._copy(destination, source, n_bytes, caller, "memcpy")
+
+    def memmove(self, destination, source, n_bytes, caller):
+        """
+        Like memcpy, but `source` and `destination` may overlap.
+        """
+        return self._copy(destination, source, n_bytes, caller, "memmove")
+
+    def _copy(self, destination, source, n_bytes, caller, function):
+        if n_bytes == 0:
+            return destination
+
+        source_allocation, source_offset = source.into_target()
+        destination_allocation, destination_offset = destination.into_target()
+        source_start = source_allocation.span(source_offset, n_bytes, READ)
+        destination_start = destination_allocation.span(
+            destination_offset, n_bytes, WRITE
+        )
+        if (
+            function == "memcpy"
+            and source_start < destination_start + n_bytes
+            and destination_start < source_start + n_bytes
+        ):
+            raise Exception(
+                f"memcpy(): source and destination overlap at {caller}, use memmove instead"
+            )
+
+        self.heap.copy(destination_start, source_start, n_bytes)
+        return destination
+
+    def memset(self, destination, byte, n_bytes, caller):
+        if n_bytes == 0:
+            return destination
+
+        allocation, offset = destination.into_target()
+        self.heap.fill(allocation.span(offset, n_bytes, WRITE), n_bytes, byte & 0xFF)
+        return destination
+
+    def memcmp(self, first, second, n_bytes, caller):
+        """
+        Compares `n_bytes` of both pointers as unsigned bytes. Returns a
+        negative number, zero or a positive number, like C.
+        """
+        if n_bytes == 0:
+            return 0
+
+        first_allocation, first_offset = first.into_target()
+        second_allocation, second_offset = second.into_target()
+        first_bytes = first_allocation.read(n_bytes, first_offset)
+        second_bytes = second_allocation.read(n_bytes, second_offset)
+        return (first_bytes > second_bytes) - (first_bytes < second_bytes)
+
+    def _live_allocation(self, obj, function):
+        """
+        Returns the live allocation `obj` points to the start of. Fails like
+        the C library would if `obj` is not a pointer returned by malloc.
+        """
+        allocation = self.allocations.get(int(obj))
+        if allocation is None or obj.into_allocation() is not allocation:
+            raise Exception(f"{function}(): {self._describe_invalid_pointer(obj)}")
+
+        return allocation
+
+    def _describe_invalid_pointer(self, obj):
+        target = obj.allocation if isinstance(obj, Value) else obj
+        if target.freed:
+            return f"double free of block allocated at {target.allocated_at}"
+
+        address = int(obj)
+        if owner := self.allocations.find(address):
+            return (
+                f"invalid pointer 0x{address:x}, it is {address - owner.address} bytes "
+                f"inside a block of {owner.size} bytes allocated at {owner.allocated_at}"
+            )
+
+        return f"invalid pointer 0x{address:x}, not returned by malloc"
+
+    def find_allocation(self, address):
+        """
+        Returns the live allocation containing `address`, or None.
+        """
+        return self.allocations.find(int(address))
+
+    def wild_allocation(self, address):
+        """
+        Returns the target of a pointer to `address`, which is not inside
+        any live block. Accessing it fails.
+        """
+        if self.sanitizer is None:
+            return Allocation(None, 0, address)
+
+        # Let the shadow map tell what the pointer points to
+        return SanitizedAllocation(
+            None, 0, address, heap=self.heap, offset=address - self.base_brk
+        )
 
     def sizeof(self, object):
         return object.sizeof()
 
-    def print_leak_summary(self):
-        leak_sources = {}
-        total_leaked = 0
+    def heap_stats(self):
+        """
+        Returns current allocation counters, overall and per call site. The
+        cost depends on the number of call sites, not on the number of
+        live blocks.
+        """
+        return {
+            "heap_size": self.heap_size,
+            "in_use": self.currently_allocated,
+            "peak_in_use": self.peak_allocated,
+            "live_blocks": len(self.allocations),
+            "brk": self.brk,
+            "realloc_bytes_copied": self.realloc_bytes_copied,
+            "realloc_bytes_grown_in_place": self.realloc_bytes_grown_in_place,
+            "sites": [stats.as_dict() for stats in self.site_stats.values()],
+        }
+
+    def snapshot(self):
+        """
+        Captures the state of the heap: contents, initialization flags, live
+        allocations, allocator state and counters. Taking a snapshot only
+        copies metadata, heap pages are copied when they are next written.
+        """
+        return Snapshot(self)
+
+    def restore(self, snapshot):
+        """
+        Brings the heap back to the moment `snapshot` was taken. Snapshots
+        taken after it are dropped, older ones can still be restored.
+
+        Blocks that were live at that moment are live again, and blocks
+        allocated since are considered freed.
+        """
+        self.heap.restore(snapshot.heap)
         for allocation in self.allocations:
-            if leaks := leak_sources.get(allocation.allocated_at):
-                leaks.append(allocation)
-            else:
-                leak_sources[allocation.allocated_at] = [allocation]
+            if snapshot.allocations.get(allocation.address) is not allocation:
+                allocation.mark_freed()
+        for allocation, size, allocated_at in snapshot.sizes:
+            allocation.freed = False
+            allocation.size = size
+            allocation.allocated_at = allocated_at
+
+        self.allocations = snapshot.allocations.copy()
+        self.allocator = snapshot.allocator.copy()
+        if self.sanitizer:
+            self.sanitizer = self.heap.sanitizer = snapshot.sanitizer.copy()
+        self.site_stats = {
+            site: copy.copy(stats) for site, stats in snapshot.site_stats.items()
+        }
+        self.currently_allocated = snapshot.currently_allocated
+        self.peak_allocated = snapshot.peak_allocated
+        self.realloc_bytes_copied = snapshot.realloc_bytes_copied
+        self.realloc_bytes_grown_in_place = snapshot.realloc_bytes_grown_in_place
 
-            total_leaked += allocation.size
+    def heap_map(self):
+        """
+        Returns a summary of the free space of the heap. Every figure is kept
+        up to date by the allocator, so the cost does not depend on the
+        number of blocks.
+
+        external_fragmentation is 1 - largest_free_block / free_bytes: 0 when
+        all the free memory is in one block, close to 1 when it is scattered
+        in many small ones. free_histogram lists (low, high, count) for the
+        free blocks with sizes in [low, high).
+        """
+        allocator = self.allocator
+        free_bytes = allocator.free_bytes
+        largest = allocator.largest_free_block()
+        histogram = allocator.free_histogram()
+        return {
+            "heap_size": self.heap_size,
+            "in_use": self.currently_allocated,
+            "live_blocks": len(self.allocations),
+            "free_bytes": free_bytes,
+            "free_blocks": sum(histogram),
+            "largest_free_block": largest,
+            "external_fragmentation": 1 - largest / free_bytes if free_bytes else 0.0,
+            "free_histogram": [
+                (1 << size_class, 2 << size_class, count)
+                for size_class, count in enumerate(histogram)
+                if count
+            ],
+        }
+
+    def heap_regions(self):
+        """
+        Yields (offset, size, owner) for every block of the heap in address
+        order. Used blocks are owned by the call site that allocated them,
+        free blocks have None as owner. Sizes include any padding added by
+        the allocator and redzones, so the regions cover the whole heap.
+        Blocks in the quarantine of checks="sanitize" count as used.
+        """
+        allocator = self.allocator
+        used = (
+            (
+                allocation.offset - self.redzone,
+                allocator.block_size(allocation.offset - self.redzone),
+                allocation.allocated_at,
+            )
+            for allocation in self.allocations
+        )
+        free = ((start, size, None) for start, size in allocator.free_blocks())
+        quarantined = sorted(
+            (start, size, allocation.allocated_at)
+            for allocation, _, start, size in (
+                self.sanitizer.quarantine if self.sanitizer else ()
+            )
+        )
+        yield from heapq.merge(
+            used, free, quarantined, key=lambda region: region[0]
+        )
+
+    def render_heap_map(self, width=64, format="text"):
+        """
+        Draws the heap as a strip of `width` buckets, as text or as SVG,
+        followed by the figures of heap_map.
+        """
+        return heap_map.render(self.heap_map(), self.heap_regions(), width, format)
+
+    def print_leak_summary(self):
+        leak_sources = [
+            stats for stats in self.site_stats.values() if stats.live_blocks
+        ]
 
         if leak_sources:
             print()
             print()
             print("======= MEMORY LEAKS FOUND!!! =======")
-            for source, leaks in leak_sources.items():
-                bytes_leaked = sum(leak.size for leak in leaks)
+            for stats in leak_sources:
                 print(
-                    f"{bytes_leaked} bytes lost in {len(leaks)} allocations at {source}"
+                    f"{stats.live_bytes} bytes lost in {stats.live_blocks} allocations at {stats.site}"
                 )
 
             print("=====================================")
             print(
-                f"Total lost: {total_leaked} bytes in {len(self.allocations)} allocations"
+                f"Total lost: {self.currently_allocated} bytes in {len(self.allocations)} allocations"
             )
 
     def __enter__(self):
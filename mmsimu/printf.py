@@ -0,0 +1,295 @@
+"""
+printf-style formatting for simulated programs.
+
+Format strings are compiled once into a list of segments, literal text and
+conversions, and cached. Conversions follow C: flags (`-+ #0`), width and
+precision (numbers or `*`), length modifiers (`hh h l ll j z t L`) and the
+d i u o x X e E f F g G c s p % conversions.
+"""
+
+import atexit
+import functools
+import re
+import sys
+
+from mmsimu.allocation import NULL
+from mmsimu.instance import get_instance
+
+
+# Bits of the integer types selected by each length modifier, int by default
+LENGTH_BITS = {
+    "hh": 8,
+    "h": 16,
+    None: 32,
+    "l": 64,
+    "ll": 64,
+    "j": 64,
+    "z": 64,
+    "t": 64,
+    "L": 64,
+}
+
+INTEGER_CONVERSIONS = "diouxX"
+
+SPECIFIER = re.compile(
+    r"%(?P<flags>[-+ #0]*)(?P<width>\*|\d+)?(?:\.(?P<precision>\*|\d*))?"
+    r"(?P<length>hh|h|ll|l|j|z|t|L)?(?P<conversion>[diouxXeEfFgGcsp%])?"
+)
+
+
+class Conversion:
+    """
+    One `%...` of a format string.
+    """
+
+    def __init__(self, specifier, flags, width, precision, length, conversion):
+        self.specifier = specifier
+        self.flags = flags
+        self.width = width  # None, "*" or a number
+        self.precision = precision  # None, "*" or a number
+        self.length = length
+        self.conversion = conversion
+        self.bits = LENGTH_BITS[length]
+        # Python's % operator handles flags, width and precision once the
+        # argument has been converted like C would
+        self.python_conversion = {"u": "d", "c": "s", "p": "s"}.get(
+            conversion, conversion
+        )
+        # C's `#` depends on the value: no 0x prefix for 0, and for %o it
+        # forces a leading zero instead of Python's 0o prefix
+        self.alternate = "#" in flags and conversion in "oxX"
+        if width != "*" and precision != "*" and not self.alternate:
+            self.template = self._template(flags, width, precision)
+        else:
+            self.template = None
+
+    def _template(self, flags, width, precision):
+        if self.python_conversion == "s":
+            # Only left alignment and width apply to strings, the precision
+            # of %s is applied when reading the string
+            flags = "-" if "-" in flags else ""
+            precision = None
+        elif self.conversion in INTEGER_CONVERSIONS:
+            if self.conversion in "uoxX":
+                # The sign flags only apply to signed conversions
+                flags = flags.replace("+", "").replace(" ", "")
+            if precision is not None:
+                # C ignores the 0 flag of integers when a precision is given
+                flags = flags.replace("0", "")
+        return (
+            f"%{flags}{'' if width is None else width}"
+            f"{'' if precision is None else '.' + str(precision)}"
+            f"{self.python_conversion}"
+        )
+
+    def format(self, args, index):
+        """
+        Formats the arguments this conversion consumes, starting at
+        args[index]. Returns the text and the index of the next argument.
+        """
+        flags, width, precision = self.flags, self.width, self.precision
+        if width == "*":
+            width, index = int(_argument(args, index, self)), index + 1
+            if width < 0:
+                # A negative width is taken as the `-` flag
+                flags, width = flags + "-", -width
+        if precision == "*":
+            precision, index = int(_argument(args, index, self)), index + 1
+            if precision < 0:
+                # A negative precision is taken as if it was omitted
+                precision = None
+
+        value = self.convert(_argument(args, index, self), precision)
+        if precision == 0 and value == 0 and self.conversion in INTEGER_CONVERSIONS:
+            # C prints no digits for 0 with a precision of 0: only the sign
+            # flags of %d and %i, or the leading zero of %#o
+            if self.conversion in "di":
+                text = "+" if "+" in flags else " " if " " in flags else ""
+            else:
+                text = "0" if self.alternate and self.conversion == "o" else ""
+            align = "-" if "-" in flags else ""
+            return f"%{align}{'' if width is None else width}s" % text, index + 1
+
+        template = self.template
+        if template is None:
+            if self.alternate:
+                flags = flags.replace("#", "")
+                if self.conversion == "o" and value:
+                    digits = len("%o" % value) + 1
+                    if precision is None:
+                        # The precision that forces the leading zero is not
+                        # the program's, so the 0 flag still applies
+                        flags = flags.replace("+", "").replace(" ", "")
+                        template = f"%{flags}{'' if width is None else width}.{digits}o"
+                    else:
+                        precision = max(precision, digits)
+                elif value:
+                    flags += "#"
+            if template is None:
+                template = self._template(flags, width, precision)
+
+        return template % value, index + 1
+
+    def convert(self, value, precision):
+        conversion = self.conversion
+        if conversion in "di":
+            value = int(value) & ((1 << self.bits) - 1)
+            if value >> (self.bits - 1):
+                value -= 1 << self.bits
+            return value
+        if conversion in "uoxX":
+            return int(value) & ((1 << self.bits) - 1)
+        if conversion in "eEfFgG":
+            return float(value)
+        if conversion == "c":
+            return value if isinstance(value, str) else chr(int(value) & 0xFF)
+        if conversion == "p":
+            return f"0x{int(value):x}"
+
+        # %s: the precision limits how many bytes are read
+        return to_python_string(value, precision)
+
+
+def _argument(args, index, conversion):
+    if index >= len(args):
+        raise Exception(f"Missing argument for `{conversion.specifier}` in printf")
+    return args[index]
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_format(format):
+    """
+    Splits `format` into literal strings and Conversions.
+    """
+    segments = []
+    literal = []
+    position = 0
+    while (percent := format.find("%", position)) != -1:
+        literal.append(format[position:percent])
+        match = SPECIFIER.match(format, percent)
+        if match["conversion"] is None:
+            raise Exception(
+                f"Unrecognized format in printf: `{format[percent:match.end() + 1]}`"
+            )
+        if match["conversion"] == "%":
+            literal.append("%")
+        else:
+            if literal:
+                segments.append("".join(literal))
+                literal = []
+            width, precision = match["width"], match["precision"]
+            segments.append(
+                Conversion(
+                    match[0],
+                    match["flags"],
+                    width if width in (None, "*") else int(width),
+                    precision if precision in (None, "*") else int(precision or 0),
+                    match["length"],
+                    match["conversion"],
+                )
+            )
+        position = match.end()
+
+    literal.append(format[position:])
+    if literal := "".join(literal):
+        segments.append(literal)
+    return segments
+
+
+def format_string(format, args):
+    parts = []
+    index = 0
+    for segment in compile_format(format):
+        if segment.__class__ is str:
+            parts.append(segment)
+        else:
+            text, index = segment.format(args, index)
+            parts.append(text)
+
+    if index != len(args):
+        raise Exception(f"Unused format arguments: {args[index:]}")
+
+    return "".join(parts)
+
+
+def to_python_string(s, limit=None):
+    """
+    Returns the NUL-terminated simulated string `s` points to as a Python
+    string. Python strings are returned as they are.
+    """
+    if isinstance(s, str):
+        return s if limit is None else s[:limit]
+    if limit == 0:
+        return ""
+    if int(s) == NULL:
+        return "(null)"
+
+    allocation, offset = s.into_target()
+    return allocation.read_string(offset, limit).decode("latin-1")
+
+
+class BufferedWriter:
+    """
+    Buffers output like a C stdio stream: text is written to sys.stdout once
+    more than `capacity` characters are pending, on every newline when
+    sys.stdout is interactive, and on flush().
+    """
+
+    def __init__(self, capacity=8192):
+        self.capacity = capacity
+        self.pending = []
+        self.size = 0
+        self.stream = None
+        self.interactive = False
+
+    def write(self, text):
+        stream = sys.stdout
+        if stream is not self.stream:
+            # Output was redirected, what was pending belongs to the old stream
+            self.flush()
+            self.stream = stream
+            self.interactive = stream.isatty()
+
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size > self.capacity or (self.interactive and "\n" in text):
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.stream.write("".join(self.pending))
+            self.stream.flush()
+            self.pending = []
+            self.size = 0
+
+
+stdout = BufferedWriter()
+atexit.register(stdout.flush)
+
+
+def printf(format, *args):
+    get_instance().stdout.write(format_string(format, args))
+
+
+def sprintf(buffer, format, *args):
+    """
+    Writes the formatted string and its NUL terminator to the simulated
+    `buffer`. Returns the length of the string. Like C, nothing prevents
+    writing past the end of the buffer, which is reported as a segfault.
+    """
+    data = format_string(format, args).encode("latin-1")
+    allocation, offset = buffer.into_target()
+    allocation.write(data + b"\0", offset)
+    return len(data)
+
+
+def snprintf(buffer, size, format, *args):
+    """
+    Like sprintf, but writes at most `size` bytes including the NUL
+    terminator. Returns the length the whole string would have had.
+    """
+    data = format_string(format, args).encode("latin-1")
+    if size > 0:
+        allocation, offset = buffer.into_target()
+        allocation.write(data[: size - 1] + b"\0", offset)
+    return len(data)
@@ -0,0 +1,194 @@
+"""
+Simulated cycle costs and a per-call-site profiler.
+
+Profiler is an observer (see mmsimu.events) that charges every operation
+of the simulated program a cost taken from a CostModel, and accumulates
+cycles and wall-clock time per call site. Attach one with
+MemoryManager.start_profiling, or run a program with `--profile FILE`.
+
+The report lists the call sites by cycles spent. The collapsed-stack
+output has one `frame;frame;frame cycles` line per call site, outermost
+frame first, which flamegraph.pl and speedscope read directly. Capture
+full stacks (caller_info="stack") to get more than one frame per line.
+"""
+
+import time
+
+from mmsimu.events import MALLOC, FREE, READ, NAMES
+from mmsimu.with_caller_info import current_call_site
+
+
+class CostModel:
+    """
+    Cycles charged to each operation.
+
+    malloc, free: (max_size, cycles) pairs in increasing max_size order.
+                  A block is charged the cycles of the first pair its size
+                  fits in, or the last one if it is larger.
+    resize: Cycles of a realloc that keeps the block where it is. One that
+            moves it costs a malloc, a free and the copy.
+    copy_per_byte: Cycles per byte copied by realloc.
+    read, write: Cycles by access width in bytes. Wider accesses cost
+                 those of 8 bytes per 8 bytes.
+    """
+
+    def __init__(
+        self,
+        malloc=((64, 20), (4096, 60), (128 * 1024, 150), (1 << 64, 2000)),
+        free=((64, 15), (4096, 40), (128 * 1024, 100), (1 << 64, 1500)),
+        resize=30,
+        copy_per_byte=0.25,
+        read={1: 4, 2: 4, 4: 4, 8: 4},
+        write={1: 4, 2: 4, 4: 4, 8: 4},
+    ):
+        self.malloc = malloc
+        self.free = free
+        self.resize = resize
+        self.copy_per_byte = copy_per_byte
+        self.read = read
+        self.write = write
+
+    @staticmethod
+    def _by_size(table, size):
+        for max_size, cycles in table:
+            if size <= max_size:
+                return cycles
+        return table[-1][1]
+
+    def malloc_cycles(self, size):
+        return self._by_size(self.malloc, size)
+
+    def free_cycles(self, size):
+        return self._by_size(self.free, size)
+
+    def realloc_cycles(self, old_size, size, moved):
+        if not moved:
+            return self.resize
+        return (
+            self.malloc_cycles(size)
+            + self.free_cycles(old_size)
+            + min(old_size, size) * self.copy_per_byte
+        )
+
+    def access_cycles(self, op, size):
+        widths = self.read if op == READ else self.write
+        if (cycles := widths.get(size)) is not None:
+            return cycles
+        return -(-size // 8) * widths[8]
+
+
+class SiteProfile:
+    """
+    Costs charged to a single call site.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.cycles = 0
+        self.seconds = 0.0
+        self.operations = {}  # Operation name -> count
+        self.bytes_copied = 0
+
+    def as_dict(self):
+        return {
+            "site": str(self.site),
+            "cycles": self.cycles,
+            "seconds": self.seconds,
+            "operations": self.operations,
+            "bytes_copied": self.bytes_copied,
+        }
+
+
+class Profiler:
+    """
+    Observer that charges the operations of the simulated program to their
+    call sites. Wall-clock time is sampled at every operation: the time
+    since the previous one is charged to the call site of the current one.
+    """
+
+    def __init__(self, costs=None):
+        self.costs = costs or CostModel()
+        self.sites = {}  # Call site -> SiteProfile
+        self.sizes = {}  # Address -> size of the live blocks seen so far
+        self.last_time = time.perf_counter()
+
+    def _charge(self, site, op, cycles):
+        now = time.perf_counter()
+        if (profile := self.sites.get(site)) is None:
+            profile = self.sites[site] = SiteProfile(site)
+        profile.cycles += cycles
+        profile.seconds += now - self.last_time
+        profile.operations[NAMES[op]] = profile.operations.get(NAMES[op], 0) + 1
+        self.last_time = now
+        return profile
+
+    def on_allocation(self, op, address, size, old_address, caller):
+        costs = self.costs
+        if op == MALLOC:
+            self._charge(caller, op, costs.malloc_cycles(size))
+        elif op == FREE:
+            self._charge(caller, op, costs.free_cycles(self.sizes.pop(address, size)))
+            return
+        elif address:
+            old_size = self.sizes.pop(old_address, 0)
+            moved = address != old_address
+            profile = self._charge(
+                caller, op, costs.realloc_cycles(old_size, size, moved)
+            )
+            if moved:
+                profile.bytes_copied += min(old_size, size)
+        else:
+            # Failed realloc, the old block is left untouched
+            self._charge(caller, op, costs.malloc_cycles(size))
+
+        if address:
+            self.sizes[address] = size
+
+    def on_access(self, op, address, size):
+        self._charge(current_call_site(), op, self.costs.access_cycles(op, size))
+
+    def total_cycles(self):
+        return sum(profile.cycles for profile in self.sites.values())
+
+    def hot_spots(self):
+        """
+        Returns the SiteProfile of every call site, most cycles first.
+        """
+        return sorted(self.sites.values(), key=lambda profile: -profile.cycles)
+
+    def print_report(self, top=20):
+        total = self.total_cycles()
+        print()
+        print("======= PROFILE (simulated cycles) =======")
+        print(f"{'cycles':>14}{'%':>8}{'seconds':>10}  site")
+        for profile in self.hot_spots()[:top]:
+            share = 100 * profile.cycles / total if total else 0.0
+            operations = ", ".join(
+                f"{count} {name}" for name, count in profile.operations.items()
+            )
+            print(
+                f"{profile.cycles:>14.0f}{share:>7.1f}%{profile.seconds:>10.4f}  "
+                f"{profile.site} ({operations})"
+            )
+        print(f"Total: {total:.0f} cycles")
+        print("==========================================")
+
+    def collapsed_stacks(self, metric="cycles"):
+        """
+        Yields `frame;...;frame value` lines, outermost frame first, with
+        the cycles (metric="cycles") or microseconds (metric="seconds") of
+        every call site.
+        """
+        for profile in self.hot_spots():
+            frames = reversed(list(profile.site.frames()))
+            stack = ";".join(f"{site.function}:{site.lineno}" for site in frames)
+            if metric == "seconds":
+                value = round(profile.seconds * 1e6)
+            else:
+                value = round(profile.cycles)
+            yield f"{stack} {value}"
+
+    def save_collapsed_stacks(self, path, metric="cycles"):
+        with open(path, "w") as output:
+            for line in self.collapsed_stacks(metric):
+                output.write(line + "\n")
@@ -0,0 +1,150 @@
+"""
+Replays the allocations of a recorded trace (see mmsimu.trace) against the
+allocators of ALLOCATION_POLICIES, without running the program that
+produced it. This allows comparing placement policies and heap sizes on
+the exact same workload.
+"""
+
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from mmsimu.allocation import NULL
+from mmsimu.events import MALLOC, FREE
+from mmsimu.memory_manager import ALLOCATION_POLICIES
+from mmsimu.trace import iter_trace, load_trace
+
+
+def load_allocation_ops(path):
+    """
+    Returns the (op, site, address, size, old_address) columns of the
+    malloc, realloc and free records of a trace as Python lists. Reads and
+    writes are dropped.
+    """
+    if numpy is not None:
+        # Filter and convert whole columns at once
+        records = load_trace(path)
+        records = records[records["op"] <= FREE]
+        return tuple(
+            records[column].tolist()
+            for column in ("op", "site", "address", "size", "old_address")
+        )
+
+    columns = ([], [], [], [], [])
+    for record in iter_trace(path):
+        if record[0] <= FREE:
+            for column, value in zip(columns, record):
+                column.append(value)
+
+    return columns
+
+
+def default_heap_size(ops):
+    """
+    Smallest heap that spans every block of the recorded run.
+    """
+    _, _, addresses, sizes, _ = ops
+    blocks = [(a, s) for a, s in zip(addresses, sizes) if a != NULL]
+    if not blocks:
+        return 0
+
+    return max(a + s for a, s in blocks) - min(a for a, _ in blocks)
+
+
+def replay(ops, policy, heap_size):
+    """
+    Runs the recorded malloc/realloc/free sequence on a fresh allocator of
+    the given policy and returns a dict with the results.
+
+    Only placement is simulated: the allocator is driven directly, with no
+    heap contents, Allocation objects or per-site statistics, and realloc
+    always moves the block like MemoryManager does by default.
+
+    Allocations that failed in the recorded run are skipped, since the
+    program did not use them. Allocations that fail during the replay are
+    counted, and later operations on them are ignored.
+    """
+    allocator = ALLOCATION_POLICIES[policy](heap_size)
+    allocate = allocator.allocate
+    release = allocator.free
+    live = {}  # Recorded address -> (offset, size) of the replayed block
+    pop = live.pop
+    failed = 0
+    in_use = 0
+    peak_in_use = 0
+
+    start = time.perf_counter()
+    for op, address, size, old_address in zip(ops[0], *ops[2:]):
+        if op == FREE:
+            if (block := pop(address, None)) is not None:
+                release(block[0])
+                in_use -= block[1]
+            continue
+
+        if address == NULL:
+            continue
+
+        old = None if op == MALLOC else pop(old_address, None)
+        offset = allocate(size)
+        if offset is None:
+            if old is not None:
+                # The recorded program kept using the block at its new address
+                live[address] = old
+            failed += 1
+            continue
+
+        if old is not None:
+            release(old[0])
+            in_use -= old[1]
+        live[address] = (offset, size)
+        in_use += size
+        if in_use > peak_in_use:
+            peak_in_use = in_use
+
+    seconds = time.perf_counter() - start
+    peak_extent = allocator.top
+    return {
+        "policy": policy,
+        "heap_size": heap_size,
+        "operations": len(ops[0]),
+        "seconds": seconds,
+        "ops_per_second": len(ops[0]) / seconds if seconds else 0,
+        "peak_in_use": peak_in_use,
+        "peak_extent": peak_extent,
+        "failed_allocations": failed,
+        # Johnstone & Wilson: heap extent needed beyond the live data, at peak
+        "fragmentation": (peak_extent - peak_in_use) / peak_in_use
+        if peak_in_use
+        else 0.0,
+    }
+
+
+def replay_trace(path, policies=None, heap_size=None):
+    """
+    Replays a trace file once per policy. Returns a list of result dicts.
+    """
+    ops = load_allocation_ops(path)
+    if heap_size is None:
+        heap_size = default_heap_size(ops)
+
+    return [
+        replay(ops, policy, heap_size)
+        for policy in (policies or ALLOCATION_POLICIES)
+    ]
+
+
+def print_report(results):
+    print(
+        f"{'policy':<16}{'heap size':>12}{'ops/s':>14}{'peak in use':>14}"
+        f"{'peak extent':>14}{'failed':>8}{'frag':>8}"
+    )
+    for result in results:
+        print(
+            f"{result['policy']:<16}{result['heap_size']:>12}"
+            f"{result['ops_per_second']:>14.0f}{result['peak_in_use']:>14}"
+            f"{result['peak_extent']:>14}{result['failed_allocations']:>8}"
+            f"{result['fragmentation']:>8.3f}"
+        )
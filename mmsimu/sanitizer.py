@@ -0,0 +1,219 @@
+"""
+AddressSanitizer-style checking, used with checks="sanitize".
+
+Every block is surrounded by redzones, bytes no block owns, and freed
+blocks are kept in a quarantine before the allocator can reuse them. A
+shadow map holds the state of every heap byte, so each access is checked
+with one lookup per byte. Overflows into a redzone and accesses to freed
+blocks are found by address, even through pointers loaded from memory
+that carry no information about the block they came from.
+
+The quarantine is bounded by a byte budget: once it is exceeded the oldest
+blocks are handed back to the allocator. Long runs keep detecting recent
+use after free without holding on to every freed block.
+
+The shadow map belongs to the heap (see Heap.add_shadow): it has the same
+backing, so only its touched pages take memory, and snapshots save its
+pages copy-on-write along with the contents. Like in ASan, addressable
+bytes are 0 and so is everything outside of the blocks: allocating only
+writes the redzones, and a huge block that is never freed leaves the rest
+of its shadow untouched.
+"""
+
+import collections
+import copy
+
+from mmsimu.allocation import Allocation
+from mmsimu.events import READ
+
+
+# Shadow states, one per heap byte. Bytes outside of any block are
+# ADDRESSABLE too: the block index tells them apart, as they can only be
+# reached out of the bounds of a block or through a wild pointer, and both
+# are reported anyway.
+ADDRESSABLE = 0
+REDZONE = 1
+FREED = 2
+
+# Most shadow bytes written at once, to bound the temporary buffer
+MARK_CHUNK = 1 << 20
+
+
+class Sanitizer:
+    def __init__(self, heap, redzone=16, quarantine_bytes=1 << 20):
+        """
+        heap: Heap whose blocks are checked. Its shadow map is created here.
+        redzone: Bytes of redzone on each side of every block.
+        quarantine_bytes: Most bytes of freed blocks kept in quarantine.
+        """
+        self.heap = heap
+        self.redzone = redzone
+        self.quarantine_bytes = quarantine_bytes
+        self.shadow = heap.shadow if heap.shadow is not None else heap.add_shadow()
+        # (allocation, freed_at, block offset, block size), oldest first
+        self.quarantine = collections.deque()
+        self.quarantined_bytes = 0
+
+    def allocated(self, allocation, block_offset, block_size):
+        """
+        Marks the rest of the allocator block of a new allocation, including
+        any padding, as redzones. The block comes from free memory, whose
+        shadow is already addressable.
+        """
+        start = allocation.offset
+        self._mark(block_offset, start, REDZONE)
+        self._mark(start + allocation.size, block_offset + block_size, REDZONE)
+
+    def resized(self, allocation, old_size, block_offset, block_size, old_block_size):
+        """
+        Moves the redzone after a block resized in place. If it shrank, the
+        tail it gave back to the allocator is left addressable like any
+        free memory.
+        """
+        old_end = allocation.offset + old_size
+        self._mark(old_end, block_offset + old_block_size, ADDRESSABLE)
+        self._mark(
+            allocation.offset + allocation.size, block_offset + block_size, REDZONE
+        )
+
+    def freed(self, allocation, caller, block_offset, block_size):
+        """
+        Puts a freed block in quarantine. Returns the offsets of the blocks
+        that left the quarantine to stay within its budget, which the
+        allocator can now reuse.
+
+        Blocks larger than the whole quarantine are handed back right away,
+        like ASan does, without writing the shadow of their contents.
+        """
+        start, end = allocation.offset, allocation.offset + allocation.size
+        if block_size > self.quarantine_bytes:
+            self._mark(block_offset, start, ADDRESSABLE)
+            self._mark(end, block_offset + block_size, ADDRESSABLE)
+            return [block_offset]
+
+        self._mark(start, end, FREED)
+        self.quarantine.append((allocation, caller, block_offset, block_size))
+        self.quarantined_bytes += block_size
+
+        return self._release(self.quarantine_bytes)
+
+    def drain(self):
+        """
+        Empties the quarantine, for when the heap has no room left otherwise.
+        Returns the offsets of the released blocks.
+        """
+        return self._release(0)
+
+    def _release(self, budget):
+        released = []
+        while self.quarantine and self.quarantined_bytes > budget:
+            _, _, block_offset, block_size = self.quarantine.popleft()
+            self.quarantined_bytes -= block_size
+            self._mark(block_offset, block_offset + block_size, ADDRESSABLE)
+            released.append(block_offset)
+
+        return released
+
+    def _mark(self, start, end, state):
+        if end <= start:
+            return
+
+        if self.heap.snapshots:
+            self.heap.preserve(start, end - start)
+        chunk = memoryview(bytes((state,)) * min(end - start, MARK_CHUNK))
+        for position in range(start, end, MARK_CHUNK):
+            n_bytes = min(MARK_CHUNK, end - position)
+            self.shadow[position : position + n_bytes] = chunk[:n_bytes]
+
+    def state(self, offset):
+        if 0 <= offset < len(self.shadow):
+            return self.shadow[offset]
+        return ADDRESSABLE
+
+    def quarantined_block(self, offset):
+        """
+        Returns the (allocation, freed_at, ...) entry of the quarantined
+        block containing the heap `offset`, or None.
+        """
+        for entry in self.quarantine:
+            _, _, block_offset, block_size = entry
+            if block_offset <= offset < block_offset + block_size:
+                return entry
+
+        return None
+
+    def report(self, allocation, offset, n_bytes, op):
+        """
+        Raises the error for an access of `n_bytes` at base+`offset` of
+        `allocation` that touches bytes that are not addressable.
+        """
+        start = allocation.offset + offset
+        position = next(
+            (p for p in range(start, start + n_bytes) if self.state(p) != ADDRESSABLE),
+            start,
+        )
+        state = self.state(position)
+        gerund = "reading" if op == READ else "writing"
+        access = f"{gerund} {n_bytes} bytes at 0x{allocation.address + offset:x}"
+
+        if state == FREED:
+            freed, freed_at, _, _ = self.quarantined_block(position)
+            raise Exception(
+                f"Segmentation fault -- heap-use-after-free, {access}, "
+                f"{position - freed.offset} bytes inside a block of {freed.size} "
+                f"bytes allocated at {freed.allocated_at} and freed at {freed_at}"
+            )
+
+        if state == REDZONE and allocation.allocated_at is not None:
+            end = allocation.offset + allocation.size
+            where = (
+                f"{allocation.offset - position} bytes before"
+                if position < allocation.offset
+                else f"{position - end} bytes after"
+            )
+            raise Exception(
+                f"Segmentation fault -- heap-buffer-overflow, {access}, {where} "
+                f"the block of {allocation.size} bytes allocated at "
+                f"{allocation.allocated_at}"
+            )
+
+        raise Exception(
+            f"Segmentation fault -- wild pointer, {access}, outside of any block"
+        )
+
+    def copy(self):
+        """
+        Returns a sanitizer with the same quarantine that can change
+        independently. The shadow map is shared, heap snapshots save it.
+        """
+        sanitizer = copy.copy(self)
+        sanitizer.quarantine = collections.deque(self.quarantine)
+        sanitizer.quarantined_bytes = self.quarantined_bytes
+        return sanitizer
+
+
+class SanitizedAllocation(Allocation):
+    """
+    Every check of Allocation, plus the shadow map of the heap: accesses
+    that touch a redzone or a block in quarantine, and every access through
+    a wild pointer, are reported before anything else.
+    """
+
+    __slots__ = ()
+
+    def span(self, offset, n_bytes, op=READ):
+        heap = self.heap
+        if heap is not None:
+            start = self.offset + offset
+            sanitizer = heap.sanitizer
+            # Slicing first also works on mapped shadow maps, which have no
+            # count(sub, start, end)
+            if (
+                start < 0
+                or self.allocated_at is None
+                or sanitizer.shadow[start : start + n_bytes].count(ADDRESSABLE)
+                != n_bytes
+            ):
+                sanitizer.report(self, offset, n_bytes, op)
+
+        return super().span(offset, n_bytes, op)
@@ -0,0 +1,31 @@
+import copy
+
+
+class Snapshot:
+    """
+    State of a MemoryManager at some point in time, see
+    MemoryManager.snapshot.
+
+    Heap contents are copied lazily, a page at a time, when they are about
+    to be modified. Allocator state, live allocations and counters are
+    copied when the snapshot is taken.
+    """
+
+    def __init__(self, mm):
+        self.heap = mm.heap.snapshot()
+        self.allocator = mm.allocator.copy()
+        # Only the quarantine, the heap snapshot holds the shadow map
+        self.sanitizer = mm.sanitizer.copy() if mm.sanitizer else None
+        self.allocations = mm.allocations.copy()
+        # Blocks resized in place by realloc keep their Allocation
+        self.sizes = [
+            (allocation, allocation.size, allocation.allocated_at)
+            for allocation in mm.allocations
+        ]
+        self.site_stats = {
+            site: copy.copy(stats) for site, stats in mm.site_stats.items()
+        }
+        self.currently_allocated = mm.currently_allocated
+        self.peak_allocated = mm.peak_allocated
+        self.realloc_bytes_copied = mm.realloc_bytes_copied
+        self.realloc_bytes_grown_in_place = mm.realloc_bytes_grown_in_place
@@ -0,0 +1,38 @@
+class CallSiteStats:
+    """
+    Allocation counters of a single call site, updated on every malloc,
+    realloc and free of a block allocated there.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.live_bytes = 0
+        self.live_blocks = 0
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.peak_bytes = 0
+        self.frees = 0
+
+    def allocated(self, size):
+        self.live_bytes += size
+        self.live_blocks += 1
+        self.allocations += 1
+        self.allocated_bytes += size
+        if self.live_bytes > self.peak_bytes:
+            self.peak_bytes = self.live_bytes
+
+    def freed(self, size):
+        self.live_bytes -= size
+        self.live_blocks -= 1
+        self.frees += 1
+
+    def as_dict(self):
+        return {
+            "site": str(self.site),
+            "live_bytes": self.live_bytes,
+            "live_blocks": self.live_blocks,
+            "allocations": self.allocations,
+            "allocated_bytes": self.allocated_bytes,
+            "peak_bytes": self.peak_bytes,
+            "frees": self.frees,
+        }
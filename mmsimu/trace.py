@@ -0,0 +1,138 @@
+"""
+Compact binary trace of every allocation and memory access.
+
+A trace file starts with a HEADER_SIZE bytes header followed by fixed-width
+little-endian records:
+
+    op           u1   mmsimu.events operation code
+    (padding)    3 bytes
+    site         u4   Call site id, see mmsimu.with_caller_info.call_sites
+    address      u8   Accessed address, or address returned by malloc/realloc
+    size         u8   Bytes accessed or requested
+    old_address  u8   Block passed to realloc, 0 for other operations
+
+The call-site table is written next to the trace as `<trace>.sites.json`.
+"""
+
+import json
+import struct
+
+from mmsimu.with_caller_info import call_sites, current_call_site
+
+
+MAGIC = b"MMSTRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, version, record size
+HEADER_SIZE = HEADER.size
+RECORD = struct.Struct("<B3xIQQQ")
+
+# numpy.dtype(RECORD_DTYPE) describes one record
+RECORD_DTYPE = {
+    "names": ["op", "site", "address", "size", "old_address"],
+    "formats": ["u1", "<u4", "<u8", "<u8", "<u8"],
+    "offsets": [0, 4, 8, 16, 24],
+    "itemsize": RECORD.size,
+}
+
+
+class TraceRecorder:
+    """
+    Observer that appends one record per operation to a trace file.
+
+    Records are packed into a preallocated buffer that is written out
+    whenever it fills up, so recording costs one pack_into per operation.
+    """
+
+    def __init__(self, path, buffer_records=65536):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.capacity = buffer_records
+        self.count = 0
+        self.records_written = 0
+
+    def on_allocation(self, op, address, size, old_address, caller):
+        self.record(op, caller.id, address, size, old_address)
+
+    def on_access(self, op, address, size):
+        self.record(op, current_call_site().id, address, size, 0)
+
+    def record(self, op, site, address, size, old_address=0):
+        RECORD.pack_into(
+            self.buffer, self.count * RECORD.size, op, site, address, size, old_address
+        )
+        self.count += 1
+        if self.count == self.capacity:
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[: self.count * RECORD.size])
+        self.records_written += self.count
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        with open(sites_path(self.path), "w") as sites_file:
+            json.dump(
+                [
+                    {
+                        "id": site.id,
+                        "function": site.function,
+                        "lineno": site.lineno,
+                        "filename": site.filename,
+                        "parent": site.parent.id if site.parent else None,
+                    }
+                    for site in call_sites()
+                ],
+                sites_file,
+            )
+
+
+def sites_path(trace_path):
+    return f"{trace_path}.sites.json"
+
+
+def _check_header(data, path):
+    magic, version, record_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise Exception(f"`{path}` is not a mmsimu trace (version {VERSION})")
+
+
+def load_trace(path):
+    """
+    Maps a trace file as a read-only NumPy structured array, one element
+    per record. Requires NumPy.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Loading a trace as an array requires NumPy")
+
+    with open(path, "rb") as trace_file:
+        _check_header(trace_file.read(HEADER_SIZE), path)
+
+    return numpy.memmap(
+        path, dtype=numpy.dtype(RECORD_DTYPE), mode="r", offset=HEADER_SIZE
+    )
+
+
+def iter_trace(path):
+    """
+    Yields (op, site, address, size, old_address) for every record of a
+    trace file, without NumPy.
+    """
+    with open(path, "rb") as trace_file:
+        _check_header(trace_file.read(HEADER_SIZE), path)
+        while chunk := trace_file.read(RECORD.size * 65536):
+            yield from RECORD.iter_unpack(chunk)
+
+
+def load_call_sites(path):
+    """
+    Returns the call-site table of a trace file as a list of dicts indexed
+    by site id.
+    """
+    with open(sites_path(path)) as sites_file:
+        return json.load(sites_file)
@@ -1,32 +1,31 @@
-import struct
+from mmsimu.types.scalar import ScalarType
 
-from mmsimu.allocation import Allocation
-from mmsimu.value import Value
 
+class CharType(ScalarType):
+    """
+    Single byte read as a one-character string.
+    """
 
-class CharType:
-    FORMAT = "<c"
+    def __init__(self, name="char", format="<B", dtype="u1"):
+        super().__init__(name, format, dtype)
 
-    def sizeof(*_):
-        return struct.calcsize(CharType.FORMAT)
-
-    def to_str(allocation: Allocation):
-        return str(CharType.to_native(allocation))
-
-    def to_native(data: bytes) -> str:
+    def to_native(self, data: bytes) -> str:
         assert len(data) == 1
-        return data.decode("ascii")
+        return chr(data[0])
 
-    def from_native(value: str | int) -> bytes:
+    def from_native(self, value: str | int) -> bytes:
         if isinstance(value, str):
             assert len(value) == 1
             assert 0 <= ord(value) < 256
-            return struct.pack(CharType.FORMAT, value.encode("ascii"))
+            return bytes([ord(value)])
         elif isinstance(value, int):
             assert 0 <= value < 256
-            return struct.pack(CharType.FORMAT, bytes([value]))
+            return bytes([value])
         else:
             raise Exception("Type cannot be coerced to `char`")
 
-    def __call__(_, allocation):
-        return Value(CharType, allocation)
+    def unpack_from(self, buffer, offset):
+        return chr(buffer[offset])
+
+    def pack_into(self, buffer, offset, value):
+        buffer[offset : offset + 1] = self.from_native(value)
@@ -0,0 +1,6 @@
+from mmsimu.types.scalar import ScalarType
+
+
+class FloatType(ScalarType):
+    def __init__(self, name="double", format="<d", dtype="<f8"):
+        super().__init__(name, format, dtype)
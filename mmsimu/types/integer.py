@@ -1,23 +1,20 @@
 import struct
 
-from mmsimu.allocation import Allocation
-from mmsimu.value import Value
+from mmsimu.types.scalar import ScalarType
 
 
-class IntType:
-    FORMAT = "<I"
+class IntType(ScalarType):
+    def __init__(self, name="int32_t", format="<i", dtype="<i4"):
+        super().__init__(name, format, dtype)
 
-    def sizeof(*_):
-        return struct.calcsize(IntType.FORMAT)
+    def from_native(self, value):
+        try:
+            return self.codec.pack(value)
+        except struct.error:
+            raise Exception(f"Value {value!r} cannot be coerced to `{self.name}`")
 
-    def to_str(allocation: Allocation):
-        return str(IntType.to_native(allocation))
-
-    def to_native(data: bytes) -> int:
-        return struct.unpack(IntType.FORMAT, data)[0]
-
-    def from_native(value: int) -> bytes:
-        return struct.pack(IntType.FORMAT, value)
-
-    def __call__(_, allocation):
-        return Value(IntType, allocation)
+    def pack_into(self, buffer, offset, value):
+        try:
+            self.codec.pack_into(buffer, offset, value)
+        except struct.error:
+            raise Exception(f"Value {value!r} cannot be coerced to `{self.name}`")
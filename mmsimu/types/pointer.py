@@ -0,0 +1,59 @@
+import struct
+
+from mmsimu.allocation import NULL
+from mmsimu.instance import get_instance
+from mmsimu.value import Value
+
+
+class PointerType:
+    """
+    Pointer to `pointee`, stored in memory as a 64-bit address.
+
+    Casting an allocation to a pointer type, e.g. `int32_ptr_t(allocation)`,
+    returns a Value of the pointee type. Loading a pointer from memory maps
+    the stored address back to the allocation it points into.
+    """
+
+    codec = struct.Struct("<Q")
+    size = codec.size
+    alignment = size
+    DTYPE = "<u8"
+
+    def __init__(self, pointee, name=None):
+        self.pointee = pointee
+        self.name = name or f"{pointee}*"
+
+    def sizeof(self):
+        return self.size
+
+    def to_native(self, data):
+        return self._resolve(self.codec.unpack(data)[0])
+
+    def from_native(self, value):
+        return self.codec.pack(int(value))
+
+    def pack_into(self, buffer, offset, value):
+        self.codec.pack_into(buffer, offset, int(value))
+
+    def unpack_from(self, buffer, offset):
+        return self._resolve(self.codec.unpack_from(buffer, offset)[0])
+
+    def _resolve(self, address):
+        if address == NULL:
+            return NULL
+
+        mm = get_instance()
+        allocation = mm.find_allocation(address)
+        if allocation is None:
+            # Dangling or wild pointer: printing it is fine, dereferencing it
+            # will fail as it points to a block of size 0.
+            allocation = mm.wild_allocation(address)
+
+        return Value(self.pointee, allocation, address - allocation.address)
+
+    def __call__(self, allocation):
+        allocation, offset = allocation.into_target()
+        return Value(self.pointee, allocation, offset)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,66 @@
+from mmsimu.types.character import CharType
+from mmsimu.types.floating import FloatType
+from mmsimu.types.integer import IntType
+from mmsimu.types.pointer import PointerType
+from mmsimu.types.structure import StructType
+
+
+int8_t = IntType("int8_t", "<b", "i1")
+int16_t = IntType("int16_t", "<h", "<i2")
+int32_t = IntType("int32_t", "<i", "<i4")
+int64_t = IntType("int64_t", "<q", "<i8")
+uint8_t = IntType("uint8_t", "<B", "u1")
+uint16_t = IntType("uint16_t", "<H", "<u2")
+uint32_t = IntType("uint32_t", "<I", "<u4")
+uint64_t = IntType("uint64_t", "<Q", "<u8")
+float_t = FloatType("float", "<f", "<f4")
+double_t = FloatType("double", "<d", "<f8")
+char_t = CharType()
+
+TYPES = {
+    type.name: type
+    for type in (
+        int8_t,
+        int16_t,
+        int32_t,
+        int64_t,
+        uint8_t,
+        uint16_t,
+        uint32_t,
+        uint64_t,
+        float_t,
+        double_t,
+        char_t,
+    )
+}
+
+
+def register(type):
+    TYPES[type.name] = type
+    return type
+
+
+def lookup(name):
+    """
+    Returns the type with the given C name. Names ending in `*` are
+    pointers to the type before it.
+    """
+    if name.endswith("*"):
+        return PointerType(lookup(name[:-1].rstrip()))
+
+    if (type := TYPES.get(name)) is None:
+        raise Exception(f"Unknown type `{name}`")
+    return type
+
+
+def define_struct(name, fields):
+    """
+    Defines and registers a struct type.
+
+    fields: list of (name, type) in declaration order
+
+    Example:
+
+        point_t = define_struct("point", [("x", int32_t), ("y", int32_t)])
+    """
+    return register(StructType(name, fields))
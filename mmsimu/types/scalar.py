@@ -0,0 +1,43 @@
+import struct
+
+from mmsimu.value import Value
+
+
+class ScalarType:
+    """
+    Fixed-width C type backed by a precompiled struct.Struct.
+
+    name: C name of the type, e.g. "int32_t"
+    format: struct format of a single value, e.g. "<i"
+    dtype: NumPy equivalent of `format`, e.g. "<i4"
+    """
+
+    def __init__(self, name, format, dtype):
+        self.name = name
+        self.codec = struct.Struct(format)
+        self.size = self.codec.size
+        # Scalars are naturally aligned
+        self.alignment = self.size
+        self.DTYPE = dtype
+
+    def sizeof(self):
+        return self.size
+
+    def to_native(self, data):
+        return self.codec.unpack(data)[0]
+
+    def from_native(self, value):
+        return self.codec.pack(value)
+
+    def unpack_from(self, buffer, offset):
+        return self.codec.unpack_from(buffer, offset)[0]
+
+    def pack_into(self, buffer, offset, value):
+        self.codec.pack_into(buffer, offset, value)
+
+    def __call__(self, allocation):
+        allocation, offset = allocation.into_target()
+        return Value(self, allocation, offset)
+
+    def __str__(self):
+        return self.name
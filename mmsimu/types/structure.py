@@ -0,0 +1,75 @@
+from mmsimu.value import Value
+
+
+class StructType:
+    """
+    C struct made of named fields of any other type.
+
+    Field offsets follow the usual C layout rules: each field is aligned to
+    its own alignment and the struct size is padded to a multiple of the
+    largest one. They are computed once, when the type is defined.
+
+    fields: list of (name, type) in declaration order
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = {}  # name -> (offset, type)
+        offset = 0
+        alignment = 1
+        for field_name, field_type in fields:
+            offset = _align(offset, field_type.alignment)
+            self.fields[field_name] = (offset, field_type)
+            offset += field_type.size
+            alignment = max(alignment, field_type.alignment)
+
+        self.size = _align(offset, alignment)
+        self.alignment = alignment
+        self.DTYPE = {
+            "names": list(self.fields),
+            "formats": [field_type.DTYPE for _, field_type in self.fields.values()],
+            "offsets": [offset for offset, _ in self.fields.values()],
+            "itemsize": self.size,
+        }
+
+    def sizeof(self):
+        return self.size
+
+    def field(self, name):
+        """
+        Returns the (offset, type) of a field.
+        """
+        if (field := self.fields.get(name)) is None:
+            raise Exception(f"`{self.name}` has no field named `{name}`")
+        return field
+
+    def to_native(self, data):
+        return self.unpack_from(data, 0)
+
+    def from_native(self, value: dict) -> bytes:
+        data = bytearray(self.size)
+        for name, field_value in value.items():
+            offset, field_type = self.field(name)
+            encoded = field_type.from_native(field_value)
+            data[offset : offset + len(encoded)] = encoded
+        return bytes(data)
+
+    def pack_into(self, buffer, offset, value):
+        buffer[offset : offset + self.size] = self.from_native(value)
+
+    def unpack_from(self, buffer, offset):
+        return {
+            name: field_type.unpack_from(buffer, offset + field_offset)
+            for name, (field_offset, field_type) in self.fields.items()
+        }
+
+    def __call__(self, allocation):
+        allocation, offset = allocation.into_target()
+        return Value(self, allocation, offset)
+
+    def __str__(self):
+        return f"struct {self.name}"
+
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
@@ -1,3 +1,6 @@
+from mmsimu.array_view import array_view
+
+
 class Value:
     """
     Value with an associated type.
@@ -6,11 +9,12 @@ class Value:
     values.
     """
 
+    __slots__ = ("type", "allocation", "base_offset")
+
     def __init__(self, type, allocation, base_offset=0):
         self.type = type
         self.base_offset = base_offset
         self.allocation = allocation
-        
 
     @property
     def deref(self):
@@ -21,17 +25,66 @@ class Value:
         self[0] = new_native_value
 
     def __setitem__(self, index, value):
-        offset = self.base_offset + self.type.sizeof() * index
-        self.allocation.write(self.type.from_native(value), offset=offset)
+        offset = self.base_offset + self.type.size * index
+        self.allocation.store(self.type, value, offset)
 
     def __getitem__(self, index):
-        offset = self.base_offset + self.type.sizeof() * index
-        data = self.allocation.read(self.type.sizeof(), offset=offset)
-        return self.type.to_native(data)
+        offset = self.base_offset + self.type.size * index
+        return self.allocation.load(self.type, offset=offset)
+
+    def __iter__(self):
+        """
+        Yields the elements from the one this pointer points to until the
+        end of the block.
+        """
+        return self.allocation.iter_load(self.type, self.base_offset)
+
+    def walk(self, until=0):
+        """
+        Yields the elements from the one this pointer points to until one
+        equal to `until`, like walking a NUL-terminated string. Running past
+        the end of the block without finding it is a segfault.
+        """
+        return self.allocation.iter_load(self.type, self.base_offset, until)
+
+    def field(self, name):
+        """
+        Reads a field of the struct this pointer points to, like `ptr->name`.
+        """
+        offset, field_type = self.type.field(name)
+        return self.allocation.load(field_type, offset=self.base_offset + offset)
+
+    def set_field(self, name, value):
+        """
+        Writes a field of the struct this pointer points to, like
+        `ptr->name = value`.
+        """
+        offset, field_type = self.type.field(name)
+        self.allocation.store(field_type, value, self.base_offset + offset)
+
+    def field_ptr(self, name):
+        """
+        Returns a pointer to a field of the struct this pointer points to,
+        like `&ptr->name`.
+        """
+        offset, field_type = self.type.field(name)
+        return Value(field_type, self.allocation, self.base_offset + offset)
+
+    def as_array(self, count):
+        """
+        Returns a NumPy array of `count` elements viewing the memory this
+        pointer points to. Requires NumPy.
+
+        Writes through the array go straight to the simulated memory and mark
+        it as initialized. Bounds are checked once, when creating the view.
+        """
+        return array_view(self.allocation, self.base_offset, self.type.DTYPE, count)
 
     def __add__(self, integer):
         return Value(
-            self.type, self.allocation, base_offset=(integer * self.type.sizeof())
+            self.type,
+            self.allocation,
+            base_offset=self.base_offset + integer * self.type.size,
         )
 
     def __int__(self):
@@ -46,3 +99,9 @@ class Value:
                 "This pointer does not point to the `start` of an allocation"
             )
         return self.allocation
+
+    def into_target(self):
+        """
+        Returns the allocation and the offset inside it this pointer refers to.
+        """
+        return self.allocation, self.base_offset
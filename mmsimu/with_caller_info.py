@@ -1,4 +1,194 @@
-import inspect
+import os
+import sys
+import threading
+
+
+class CallSite:
+    """
+    Location of a call: function name and line number and, when capturing
+    full stacks, the call site of the caller.
+
+    Call sites are interned, so the same location always yields the same
+    object and they can be compared and hashed by identity.
+    """
+
+    def __init__(self, id, function, lineno, filename, parent=None):
+        self.id = id
+        self.function = function
+        self.lineno = lineno
+        self.filename = filename
+        self.parent = parent
+
+    def frames(self):
+        """
+        Yields this call site and the ones of its callers, innermost first.
+        """
+        site = self
+        while site is not None:
+            yield site
+            site = site.parent
+
+    def __str__(self):
+        return " <- ".join(f"{site.function}:{site.lineno}" for site in self.frames())
+
+
+MODES = ("off", "line", "stack")
+
+_call_sites = {}
+_call_site_list = []
+_intern_lock = threading.Lock()
+_mode = "line"
+_stack_depth = 8
+
+_package_dir = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_is_simulator_code = {}
+
+
+def _in_simulator(code):
+    """
+    Whether `code` belongs to the simulator itself rather than to the
+    simulated program.
+    """
+    if (inside := _is_simulator_code.get(code)) is None:
+        inside = os.path.abspath(code.co_filename).startswith(_package_dir)
+        _is_simulator_code[code] = inside
+    return inside
+
+
+def _intern(key, function, lineno, filename, parent=None):
+    # Simulations running in other threads may intern the same key meanwhile
+    with _intern_lock:
+        if site := _call_sites.get(key):
+            return site
+
+        site = CallSite(len(_call_site_list), function, lineno, filename, parent)
+        _call_sites[key] = site
+        _call_site_list.append(site)
+        return site
+
+
+UNKNOWN_CALL_SITE = _intern(None, "<unknown>", 0, "<unknown>")
+
+
+def _capture_off(frame):
+    return UNKNOWN_CALL_SITE
+
+
+def _capture_line(frame):
+    key = (frame.f_code, frame.f_lineno)
+    if site := _call_sites.get(key):
+        return site
+
+    code = frame.f_code
+    return _intern(key, code.co_name, frame.f_lineno, code.co_filename)
+
+
+def _capture_stack(caller_frame):
+    locations = []
+    frame = caller_frame
+    while frame is not None and len(locations) < _stack_depth:
+        if _in_simulator(frame.f_code):
+            # Reached mmsimu_init, the rest of the stack is not part of the program
+            break
+        locations.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+
+    if not locations:
+        return _capture_line(caller_frame)
+
+    key = tuple(locations)
+    if site := _call_sites.get(key):
+        return site
+
+    # Intern the callers first so that stacks sharing a suffix share parents
+    site = None
+    for index in reversed(range(len(locations))):
+        suffix = key[index:]
+        if not (interned := _call_sites.get(suffix)):
+            code, lineno = locations[index]
+            interned = _intern(suffix, code.co_name, lineno, code.co_filename, site)
+        site = interned
+
+    return site
+
+
+_capture = _capture_line
+
+
+def set_caller_info_mode(mode, stack_depth=8):
+    """
+    Selects how much information with_caller_info collects:
+
+    "off": nothing, every call is attributed to the same unknown call site.
+    "line": function name and line number of the caller.
+    "stack": function names and line numbers of up to `stack_depth` frames.
+    """
+    global _capture, _mode, _stack_depth
+
+    captures = {"off": _capture_off, "line": _capture_line, "stack": _capture_stack}
+    if mode not in captures:
+        raise Exception(
+            f"Unknown caller info mode `{mode}`, expected one of: {', '.join(MODES)}"
+        )
+
+    _capture = captures[mode]
+    _mode = mode
+    _stack_depth = stack_depth
+
+
+def caller_info_mode():
+    """
+    Returns the (mode, stack_depth) selected with set_caller_info_mode.
+    """
+    return _mode, _stack_depth
+
+
+def current_call_site():
+    """
+    Returns the call site of the innermost frame of the simulated program,
+    skipping the frames of the simulator itself.
+    """
+    frame = sys._getframe(1)
+    is_simulator_code = _is_simulator_code
+    while frame is not None:
+        # Called on every observed access: look up the cache inline
+        inside = is_simulator_code.get(frame.f_code)
+        if inside is None:
+            inside = _in_simulator(frame.f_code)
+        if not inside:
+            break
+        frame = frame.f_back
+
+    if frame is None:
+        return UNKNOWN_CALL_SITE
+
+    return _capture(frame)
+
+
+def error_call_site(error):
+    """
+    Returns the call site of the innermost frame of the simulated program
+    in the traceback of `error`, or None if the error was raised outside of
+    the program.
+    """
+    site = None
+    tb = error.__traceback__
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        if not _in_simulator(code):
+            key = (code, tb.tb_lineno)
+            if not (site := _call_sites.get(key)):
+                site = _intern(key, code.co_name, tb.tb_lineno, code.co_filename)
+        tb = tb.tb_next
+
+    return site
+
+
+def call_sites():
+    """
+    Returns every call site interned so far, indexed by their id.
+    """
+    return _call_site_list
 
 
 def with_caller_info(fn):
@@ -19,10 +209,7 @@ def with_caller_info(fn):
     """
 
     def decorated(*args, **kwargs):
-        # Returns current frame, caller's frame, [caller's frame^2, caller's frame^3, ...]
-        _, caller_frame, *_ = inspect.getouterframes(inspect.currentframe(), 2)
-        caller_info = f"{caller_frame.function}:{caller_frame.lineno}"
-        kwargs["caller"] = caller_info
+        kwargs["caller"] = _capture(sys._getframe(1))
         return fn(
             *args,
             **kwargs,
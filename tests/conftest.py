@@ -0,0 +1,13 @@
+import pytest
+
+from mmsimu import log
+
+
+@pytest.fixture
+def uninit_reads():
+    """
+    Events of the uninitialized reads reported while the test runs.
+    """
+    sink = log.uninit.add_sink(log.RingBufferSink())
+    yield sink.events
+    log.uninit.remove_sink(sink)
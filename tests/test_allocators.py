@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from mmsimu.memory_manager import ALLOCATION_POLICIES
+
+
+def check_tiling(allocator, live):
+    """
+    Used and free blocks must cover the heap exactly, without gaps or
+    overlaps, and the incremental counters must match them.
+    """
+    blocks = sorted(
+        [(start, allocator.block_size(start)) for start in live]
+        + list(allocator.free_blocks())
+    )
+    position = 0
+    for start, size in blocks:
+        assert start == position
+        position += size
+    assert position == allocator.heap_size
+
+    free_sizes = [size for _, size in allocator.free_blocks()]
+    assert allocator.free_bytes == sum(free_sizes)
+    assert allocator.largest_free_block() == max(free_sizes, default=0)
+    assert sum(allocator.free_histogram()) == len(free_sizes)
+    assert allocator.in_use == sum(allocator.block_size(start) for start in live)
+    for start, size in live.items():
+        assert allocator.block_size(start) >= max(size, 1)
+
+
+@pytest.mark.parametrize("policy", ALLOCATION_POLICIES)
+def test_random_operations_tile_the_heap(policy):
+    rng = random.Random(policy)
+    allocator = ALLOCATION_POLICIES[policy](1 << 13)
+    live = {}  # start -> requested size
+    for _ in range(3000):
+        choice = rng.random()
+        if choice < 0.4 or not live:
+            size = rng.randint(0, 300)
+            if (start := allocator.allocate(size)) is not None:
+                live[start] = size
+        elif choice < 0.7:
+            start = rng.choice(list(live))
+            del live[start]
+            allocator.free(start)
+        else:
+            start = rng.choice(list(live))
+            size = rng.randint(0, 600)
+            if allocator.resize(start, size):
+                live[start] = size
+        check_tiling(allocator, live)
+
+    for start in list(live):
+        allocator.free(start)
+    assert allocator.largest_free_block() == allocator.heap_size
+    assert allocator.in_use == 0
+
+
+@pytest.mark.parametrize("policy", ALLOCATION_POLICIES)
+def test_exhaustion_returns_none(policy):
+    allocator = ALLOCATION_POLICIES[policy](1024)
+    assert allocator.allocate(2000) is None
+    assert allocator.allocate(1024) == 0
+    assert allocator.allocate(1) is None
+
+
+
+@pytest.mark.parametrize("policy", ALLOCATION_POLICIES)
+def test_copy_is_independent(policy):
+    allocator = ALLOCATION_POLICIES[policy](1024)
+    first = allocator.allocate(100)
+    clone = allocator.copy()
+    allocator.free(first)
+    allocator.allocate(50)
+
+    assert clone.in_use == clone.block_size(first)
+    check_tiling(clone, {first: 100})
+
+
+@pytest.mark.parametrize("policy", ALLOCATION_POLICIES)
+def test_resize_in_place(policy):
+    allocator = ALLOCATION_POLICIES[policy](1024)
+    start = allocator.allocate(16)
+    assert allocator.resize(start, 64)
+    assert allocator.block_size(start) >= 64
+
+    neighbour = allocator.allocate(16)
+    # Growing into a used block is impossible
+    assert not allocator.resize(start, 1024)
+    assert allocator.resize(start, 8)
+    check_tiling(allocator, {start: 8, neighbour: 16})
@@ -0,0 +1,63 @@
+import json
+import os
+import textwrap
+
+import pytest
+
+from mmsimu import batch
+
+PROGRAMS = {
+    "leaks.py": """
+        from mmsimu.all import *
+
+        def main():
+            malloc(10)
+
+        mmsimu_init(main)
+    """,
+    "segfault.py": """
+        from mmsimu.all import *
+
+        def main():
+            int32_ptr_t(malloc(4))[1] = 0
+
+        mmsimu_init(main)
+    """,
+    "exits.py": """
+        import sys
+
+        sys.exit(3)
+    """,
+}
+
+
+@pytest.fixture
+def jobs_file(tmp_path, monkeypatch):
+    # The programs import mmsimu from this checkout
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setenv("PYTHONPATH", root)
+    for name, source in PROGRAMS.items():
+        (tmp_path / name).write_text(textwrap.dedent(source))
+    path = tmp_path / "jobs.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"script": "leaks.py", "heap_size": 64, "seed": 1},
+                {"script": "segfault.py"},
+                {"script": "exits.py"},
+            ]
+        )
+    )
+    return str(path)
+
+
+def test_run_reports_every_job_in_order(jobs_file):
+    leaks, segfault, exits = batch.run(batch.load_jobs(jobs_file), workers=2)
+
+    assert leaks["status"] == "ok"
+    assert leaks["leaked_bytes"] == 10
+    assert leaks["leaks"][0]["live_blocks"] == 1
+    assert segfault["status"] == "segfault"
+    assert segfault["error"]["site"].startswith("main:")
+    assert exits["status"] == "crashed"
+    assert exits["exit_code"] == 3
@@ -0,0 +1,73 @@
+import pytest
+
+from mmsimu.all import (
+    calloc,
+    char_ptr_t,
+    int32_ptr_t,
+    malloc,
+    memcmp,
+    memcpy,
+    memmove,
+    memset,
+)
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def mm():
+    with use_instance(MemoryManager(1 << 12, seed=0)) as mm:
+        yield mm
+
+
+def test_calloc_zeroes_the_block(mm, uninit_reads):
+    numbers = int32_ptr_t(calloc(4, 4))
+    assert [numbers[i] for i in range(4)] == [0, 0, 0, 0]
+    assert not uninit_reads
+
+
+def test_calloc_size_overflow_returns_null(mm):
+    assert int(calloc(1 << 32, 1 << 32)) == 0
+
+
+def test_memcpy_copies_contents_and_initialization(mm, uninit_reads):
+    source = char_ptr_t(malloc(8))
+    for i in range(4):
+        source[i] = "abcd"[i]
+    destination = char_ptr_t(malloc(8))
+
+    assert memcpy(destination, source, 8) is destination
+    assert [destination[i] for i in range(4)] == ["a", "b", "c", "d"]
+    assert not uninit_reads
+    destination[5]
+    assert len(uninit_reads) == 1
+
+
+def test_memcpy_rejects_overlap_and_memmove_handles_it(mm):
+    text = char_ptr_t(malloc(8))
+    memset(text, ord("x"), 8)
+    text[0] = "a"
+    with pytest.raises(Exception, match="overlap"):
+        memcpy(text + 1, text, 4)
+
+    memmove(text + 1, text, 4)
+    assert [text[i] for i in range(6)] == list("aaxxxx")
+
+
+def test_memset_checks_bounds(mm):
+    block = malloc(8)
+    memset(block, 0x141, 8)
+    assert char_ptr_t(block)[7] == "A"
+    with pytest.raises(Exception, match="Segmentation fault"):
+        memset(block, 0, 9)
+
+
+def test_memcmp_compares_unsigned_bytes(mm):
+    first, second = char_ptr_t(malloc(4)), char_ptr_t(malloc(4))
+    memset(first, 0x10, 4)
+    memset(second, 0x10, 4)
+    assert memcmp(first, second, 4) == 0
+    second[3] = 0xFF
+    assert memcmp(first, second, 4) < 0
+    assert memcmp(second, first, 4) > 0
+    assert memcmp(first, second, 0) == 0
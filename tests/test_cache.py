@@ -0,0 +1,55 @@
+import pytest
+
+from mmsimu import cache
+from mmsimu.all import free, int32_ptr_t, malloc
+from mmsimu.cache import CacheLevel, CacheSimulator, make_tlb
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+def test_lru_replacement():
+    level = CacheLevel("L1", 2 * 64, line_size=64, ways=2)
+    assert level.n_sets == 1
+    # 0 was used after 1, so 2 evicts 1
+    assert level.lookup([0, 1, 0, 2, 0, 1]) == [False, False, True, False, True, False]
+
+
+def test_invalid_geometry_is_rejected():
+    with pytest.raises(Exception, match="Invalid L1 geometry"):
+        CacheLevel("L1", 1000, line_size=64, ways=8)
+    with pytest.raises(Exception, match="same line size"):
+        CacheSimulator([CacheLevel("L1", 1024), CacheLevel("L2", 4096, line_size=128)])
+
+
+@pytest.mark.parametrize("simulate", [cache._simulate_lists, cache._simulate_arrays])
+def test_batches_count_lines_per_site(simulate):
+    if simulate is cache._simulate_arrays and cache.numpy is None:
+        pytest.skip("NumPy is not installed")
+    levels = [CacheLevel("L1", 4 * 64, line_size=64, ways=4)]
+    # Two accesses to line 0, one spanning lines 1 and 2, then line 0 again
+    simulate(levels, [1, 1, 2, 3], [0, 8, 120, 16], [4, 4, 16, 4])
+    assert levels[0].misses == {1: 1, 2: 2}
+    assert levels[0].hits == {1: 1, 3: 1}
+
+
+def traverse(n, row_major):
+    with use_instance(MemoryManager(n * n * 4, seed=0)) as mm:
+        simulator = mm.add_observer(CacheSimulator(batch_size=1000))
+        matrix = int32_ptr_t(malloc(n * n * 4))
+        for a in range(n):
+            for b in range(n):
+                matrix[a * n + b if row_major else b * n + a] = 0
+        free(matrix)
+        return simulator.report()
+
+
+def test_row_major_misses_once_per_line():
+    report = traverse(128, row_major=True)
+    assert report["levels"]["L1"]["misses"] == 128 * 128 // 16
+    assert report["levels"]["TLB"]["misses"] == 128 * 128 * 4 // 4096
+    assert traverse(128, row_major=False)["levels"]["L1"]["miss_rate"] > 0.9
+
+
+def test_make_tlb_geometry():
+    tlb = make_tlb(entries=16, page_size=8192, ways=2)
+    assert (tlb.line_size, tlb.n_sets, tlb.ways) == (8192, 8, 2)
@@ -0,0 +1,58 @@
+import pytest
+
+from mmsimu.all import free, int32_ptr_t, malloc
+from mmsimu.allocation import (
+    Allocation,
+    BoundsCheckedAllocation,
+    UncheckedAllocation,
+)
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+def manager(checks):
+    return use_instance(MemoryManager(1024, checks=checks, policy="first-fit", seed=0))
+
+
+@pytest.mark.parametrize(
+    "checks, allocation_class",
+    [
+        ("full", Allocation),
+        ("bounds", BoundsCheckedAllocation),
+        ("accounting", UncheckedAllocation),
+    ],
+)
+def test_blocks_use_the_class_of_the_level(checks, allocation_class):
+    with manager(checks):
+        assert type(malloc(8)) is allocation_class
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(Exception, match="Unknown checking level"):
+        MemoryManager(1024, checks="paranoid")
+
+
+def test_full_reports_uninitialized_reads(uninit_reads):
+    with manager("full"):
+        int32_ptr_t(malloc(8))[0]
+    assert len(uninit_reads) == 1
+
+
+def test_bounds_only_checks_bounds(uninit_reads):
+    with manager("bounds"):
+        numbers = int32_ptr_t(malloc(8))
+        numbers[0]
+        with pytest.raises(Exception, match="Segmentation fault"):
+            numbers[2] = 1
+    assert not uninit_reads
+
+
+def test_accounting_checks_nothing_but_tracks_blocks():
+    with manager("accounting") as mm:
+        first = int32_ptr_t(malloc(8))
+        second = int32_ptr_t(malloc(8))
+        second[0] = 7
+        # Runs into the next block like C would
+        assert first[(int(second) - int(first)) // 4] == 7
+        free(first)
+        assert mm.heap_stats()["live_blocks"] == 1
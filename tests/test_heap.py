@@ -0,0 +1,69 @@
+import pytest
+
+from mmsimu.all import malloc, uint8_t
+from mmsimu.heap import Heap
+from mmsimu.heap_image import HeapImage, save_metadata
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.types.pointer import PointerType
+
+uint8_ptr_t = PointerType(uint8_t)
+
+
+def garbage(**options):
+    with use_instance(MemoryManager(1024, **options)):
+        block = uint8_ptr_t(malloc(64))
+        return [block[i] for i in range(64)]
+
+
+def test_seeded_fill_is_reproducible():
+    assert garbage(seed=1) == garbage(seed=1)
+    assert garbage(seed=1) != garbage(seed=2)
+
+
+def test_poison_and_zero_fills():
+    assert garbage(uninit_fill="poison") == [Heap.POISON] * 64
+    assert garbage(uninit_fill="zero") == [0] * 64
+
+
+def test_garbage_is_kept_once_read(uninit_reads):
+    with use_instance(MemoryManager(1024, seed=0)):
+        block = uint8_ptr_t(malloc(4))
+        first = block[0]
+        assert block[0] == first
+    assert len(uninit_reads) == 1
+
+
+def test_unknown_fill_is_rejected():
+    with pytest.raises(Exception, match="Unknown uninitialized memory fill"):
+        Heap(1024, uninit_fill="ones")
+
+
+@pytest.mark.parametrize("backing", Heap.BACKINGS)
+def test_backings_hold_contents_and_flags(backing, tmp_path):
+    heap = Heap(8192, backing=backing, path=tmp_path / "heap")
+    heap.write(4000, b"abcdef")
+    assert heap.read(4000, 6) == b"abcdef"
+    assert heap.size == 8192
+    assert not heap.fill_uninitialized(4000, 6)
+    assert heap.fill_uninitialized(3999, 2)
+    heap.close()
+
+
+def test_file_backing_leaves_an_image(tmp_path):
+    path = tmp_path / "heap"
+    mm = MemoryManager(4096, backing="file", heap_file=path, seed=0)
+    with use_instance(mm):
+        block = uint8_ptr_t(malloc(8))
+        block[0] = 0x2A
+    save_metadata(mm)
+    mm.heap.close()
+
+    image = HeapImage(path)
+    assert image.block(int(block) + 4)["size"] == 8
+    assert image.dump(int(block), 2).split()[1:] == ["2a", "??"]
+
+
+def test_file_backing_needs_a_path():
+    with pytest.raises(Exception, match="needs the path"):
+        Heap(1024, backing="file")
@@ -0,0 +1,53 @@
+import pytest
+
+from mmsimu import heap_map
+from mmsimu.all import free, malloc
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def mm():
+    with use_instance(MemoryManager(1024, policy="first-fit", seed=0)) as mm:
+        yield mm
+
+
+def test_bucket_usage_splits_regions_across_buckets():
+    buckets = heap_map.bucket_usage([(0, 6, "a"), (6, 4, None)], 10, 4)
+    assert [used for used, _, _ in buckets] == [3, 2, 1, 0]
+    assert [size for _, _, size in buckets] == [3, 2, 3, 2]
+    assert buckets[2][1] == {"a": 1}
+
+
+def test_fragmentation_of_scattered_free_blocks(mm):
+    blocks = [malloc(64) for _ in range(8)]
+    for block in blocks[::2]:
+        free(block)
+
+    summary = mm.heap_map()
+    assert summary["in_use"] == 4 * 64
+    assert summary["free_bytes"] == 1024 - 4 * 64
+    assert summary["largest_free_block"] == 512
+    assert summary["external_fragmentation"] == pytest.approx(1 - 512 / 768)
+    assert sum(count for _, _, count in summary["free_histogram"]) == 5
+
+
+def test_regions_cover_the_heap(mm):
+    malloc(100)
+    free(malloc(50))
+    malloc(10)
+    position = 0
+    for offset, size, _ in mm.heap_regions():
+        assert offset == position
+        position += size
+    assert position == 1024
+
+
+def test_render_text_and_svg(mm):
+    malloc(512)
+    text = mm.render_heap_map(8)
+    assert text.splitlines()[0] == "|@@@@....|"
+    assert "in use: 512 bytes in 1 blocks" in text
+    assert mm.render_heap_map(8, format="svg").startswith("<svg")
+    with pytest.raises(Exception, match="Unknown heap map format"):
+        mm.render_heap_map(8, format="png")
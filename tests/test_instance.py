@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+
+from mmsimu import instance
+from mmsimu.all import free, malloc
+from mmsimu.instance import get_instance, set_instance, use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+@pytest.fixture(autouse=True)
+def no_instance(monkeypatch):
+    # set_instance changes both, put them back for the tests that follow
+    monkeypatch.setattr(instance, "_default_instance", None)
+    token = instance._current_instance.set(None)
+    yield
+    instance._current_instance.reset(token)
+
+
+def run_in_thread(fn):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(fn()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_threads_fall_back_to_the_default_instance():
+    mm = MemoryManager(1024)
+    set_instance(mm)
+    block = run_in_thread(lambda: malloc(16))
+    assert mm.heap_stats()["live_blocks"] == 1
+    free(block)
+
+
+def test_use_instance_only_applies_to_its_context():
+    default = MemoryManager(1024)
+    local = MemoryManager(1024)
+    set_instance(default)
+    with use_instance(local):
+        assert get_instance() is local
+        assert run_in_thread(get_instance) is default
+    assert get_instance() is default
+
+
+def test_contexts_run_separate_simulations():
+    async def simulate(heap_size):
+        with use_instance(MemoryManager(heap_size)) as mm:
+            await asyncio.sleep(0)
+            malloc(16)
+            await asyncio.sleep(0)
+            return get_instance() is mm and mm.heap_stats()["in_use"] == 16
+
+    async def main():
+        return await asyncio.gather(simulate(1024), simulate(2048))
+
+    assert asyncio.run(main()) == [True, True]
+
+
+def test_no_instance_is_a_clear_error():
+    def fails():
+        try:
+            malloc(16)
+        except Exception as error:
+            return str(error)
+
+    assert "No simulator instance" in run_in_thread(fails)
@@ -0,0 +1,46 @@
+import sys
+
+from mmsimu import instance, log
+from mmsimu.all import free, malloc, printf
+from mmsimu.main import mmsimu_init
+from mmsimu.with_caller_info import caller_info_mode
+
+
+def run(monkeypatch, main, *argv, **options):
+    monkeypatch.setattr(sys, "argv", ["program", *argv])
+    monkeypatch.setattr(instance, "_default_instance", None)
+    token = instance._current_instance.set(None)
+    try:
+        mmsimu_init(main, **options)
+    finally:
+        instance._current_instance.reset(token)
+
+
+def test_runs_leave_no_global_state_behind(monkeypatch, capsys):
+    def main():
+        printf("%d\n", 42)
+        free(malloc(8))
+
+    for _ in range(2):
+        run(monkeypatch, main, "--log-alloc", "--log-uninit", caller_info="stack")
+
+    assert capsys.readouterr().out.count("42\n") == 2
+    assert caller_info_mode() == ("line", 8)
+    assert not log.alloc.sinks and not log.uninit.sinks
+    assert not log.alloc.enabled and not log.uninit.enabled
+
+
+def test_output_goes_to_the_buffer_of_the_run(monkeypatch, capsys):
+    writers = []
+
+    def main():
+        printf("inside")
+        writer = instance.get_instance().stdout
+        # Held by the run until it ends
+        assert writer.pending == ["inside"]
+        writers.append(writer)
+
+    run(monkeypatch, main)
+    run(monkeypatch, main)
+    assert capsys.readouterr().out == "insideinside"
+    assert writers[0] is not writers[1]
@@ -0,0 +1,113 @@
+import pytest
+
+from mmsimu.all import NULL, free, int32_ptr_t, malloc, realloc, restore, snapshot
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import ALLOCATION_POLICIES, MemoryManager
+
+
+@pytest.fixture(params=list(ALLOCATION_POLICIES))
+def mm(request):
+    with use_instance(MemoryManager(1024, policy=request.param, seed=0)) as mm:
+        yield mm
+
+
+def test_blocks_do_not_overlap(mm):
+    blocks = [malloc(size) for size in (10, 20, 30, 40)]
+    spans = sorted((int(block), int(block) + block.size) for block in blocks)
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert end <= start
+    for block in blocks:
+        free(block)
+    assert mm.heap_stats()["in_use"] == 0
+
+
+def test_out_of_memory_returns_null(mm):
+    assert malloc(2000) == NULL
+    assert mm.heap_stats()["live_blocks"] == 0
+
+
+def test_realloc_keeps_contents(mm):
+    numbers = int32_ptr_t(malloc(16))
+    for i in range(4):
+        numbers[i] = i * 10
+    numbers = int32_ptr_t(realloc(numbers, 64))
+    assert [numbers[i] for i in range(4)] == [0, 10, 20, 30]
+    free(numbers)
+
+
+def test_use_after_free_and_double_free(mm):
+    numbers = int32_ptr_t(malloc(16))
+    free(numbers)
+    with pytest.raises(AssertionError, match="after free"):
+        numbers[0]
+    with pytest.raises(Exception, match="double free"):
+        free(numbers)
+
+
+def test_out_of_bounds(mm):
+    numbers = int32_ptr_t(malloc(16))
+    with pytest.raises(Exception, match="Segmentation fault"):
+        numbers[4] = 1
+    free(numbers)
+
+
+def test_leaks_per_call_site(mm):
+    malloc(8)
+    malloc(8)
+    stats = mm.heap_stats()
+    assert stats["in_use"] == 16
+    assert [site["live_blocks"] for site in stats["sites"]] == [1, 1]
+
+
+@pytest.fixture(params=list(ALLOCATION_POLICIES))
+def in_place(request):
+    manager = MemoryManager(1024, policy=request.param, realloc_mode="in-place", seed=0)
+    with use_instance(manager) as mm:
+        yield mm
+
+
+def test_realloc_in_place_keeps_the_address(in_place):
+    numbers = int32_ptr_t(malloc(16))
+    for i in range(4):
+        numbers[i] = i * 10
+    address = int(numbers)
+
+    grown = int32_ptr_t(realloc(numbers, 64))
+    assert int(grown) == address
+    assert [grown[i] for i in range(4)] == [0, 10, 20, 30]
+    shrunk = int32_ptr_t(realloc(grown, 8))
+    assert int(shrunk) == address
+    with pytest.raises(Exception, match="Segmentation fault"):
+        shrunk[2]
+
+    stats = in_place.heap_stats()
+    assert stats["in_use"] == 8
+    assert stats["realloc_bytes_copied"] == 0
+    assert stats["realloc_bytes_grown_in_place"] == 48
+    free(shrunk)
+
+
+def test_restore_after_realloc_in_place(in_place):
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    saved = snapshot()
+    numbers = int32_ptr_t(realloc(numbers, 64))
+    numbers[15] = 2
+
+    restore(saved)
+    assert numbers[0] == 1
+    stats = in_place.heap_stats()
+    assert stats["in_use"] == 16
+    assert stats["realloc_bytes_grown_in_place"] == 0
+    with pytest.raises(Exception, match="Segmentation fault"):
+        numbers[15]
+
+
+def test_restore_brings_back_the_realloc_counters(mm):
+    numbers = malloc(16)
+    saved = snapshot()
+    free(realloc(numbers, 32))
+    assert mm.heap_stats()["realloc_bytes_copied"] == 16
+
+    restore(saved)
+    assert mm.heap_stats()["realloc_bytes_copied"] == 0
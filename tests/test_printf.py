@@ -0,0 +1,102 @@
+import ctypes
+import ctypes.util
+
+import pytest
+
+from mmsimu.all import char_ptr_t, free, malloc, snprintf, sprintf
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.printf import format_string, to_python_string
+
+
+@pytest.fixture
+def mm():
+    with use_instance(MemoryManager(4096, seed=0)) as mm:
+        yield mm
+
+
+@pytest.mark.parametrize(
+    "format, args, expected",
+    [
+        ("%d|%5d|%-5d|%05d", (-3, 42, 42, 42), "-3|   42|42   |00042"),
+        ("%+d % d", (5, 5), "+5  5"),
+        ("%u", (-1,), "4294967295"),
+        ("%hhd %hd %lld", (255, 65535, 1 << 40), "-1 -1 1099511627776"),
+        ("%x %X %#x %#x %o %#o %#o", (255, 255, 255, 0, 8, 8, 0), "ff FF 0xff 0 10 010 0"),
+        ("%.3d|%08.3d", (5, 5), "005|     005"),
+        ("%*d|%-*d|%.*f", (4, 1, 4, 1, 2, 3.14159), "   1|1   |3.14"),
+        ("%*d", (-4, 1), "1   "),
+        ("%e %g %.1f", (1234.5, 0.0001, 2.25), "1.234500e+03 0.0001 2.2"),
+        ("%c%c %5s|%-5s|%.2s", ("a", 98, "xy", "xy", "xyz"), "ab    xy|xy   |xy"),
+        ("100%%", (), "100%"),
+    ],
+)
+def test_matches_c(format, args, expected):
+    assert format_string(format, args) == expected
+
+
+@pytest.fixture(scope="module")
+def libc_snprintf():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c")).snprintf
+    except (OSError, AttributeError, TypeError):
+        pytest.skip("the C library can't be loaded")
+
+
+@pytest.mark.parametrize(
+    "format, args",
+    [
+        ("%05.3i|%05.3d|%08.3x", (1, 1, 255)),
+        ("%+x|% X|%+u|% o", (255, 255, 5, 8)),
+        ("%.0d|%5.0x|%-3.0u|%.0o|%+.0d|% .0i", (0, 0, 0, 0, 0, 0)),
+        ("%#05o|%#o|%#.0o|%#5.3o|%-#6o|%#6.2o", (1, 0, 0, 8, 8, 64)),
+        ("%#x|%#.0x|%#08x|%#X", (0, 0, 255, 255)),
+        ("%+05d|%-+5d|% 05d|%-05d", (-3, 3, 3, 3)),
+        ("%*.0d|%#.*o|%+.*d|%*x", (-4, 0, 0, 0, -1, 0, 6, 171)),
+    ],
+)
+def test_integers_match_the_c_library(libc_snprintf, format, args):
+    buffer = ctypes.create_string_buffer(256)
+    libc_snprintf(buffer, len(buffer), format.encode(), *map(ctypes.c_int, args))
+    assert format_string(format, args) == buffer.value.decode()
+
+
+def test_argument_errors():
+    with pytest.raises(Exception, match="Missing argument"):
+        format_string("%d %d", (1,))
+    with pytest.raises(Exception, match="Unused format arguments"):
+        format_string("%d", (1, 2))
+    with pytest.raises(Exception, match="Unrecognized format"):
+        format_string("%k", (1,))
+
+
+def test_simulated_strings(mm):
+    buffer = char_ptr_t(malloc(16))
+    assert sprintf(buffer, "%s-%d", "ab", 7) == 4
+    assert to_python_string(buffer) == "ab-7"
+    assert format_string("[%s] [%.2s]", (buffer, buffer)) == "[ab-7] [ab]"
+    assert format_string("%s", (malloc(1 << 20),)) == "(null)"
+
+    assert snprintf(buffer, 3, "%d", 12345) == 5
+    assert to_python_string(buffer) == "12"
+    free(buffer)
+
+
+def test_sprintf_overflow_is_reported(mm):
+    buffer = char_ptr_t(malloc(4))
+    with pytest.raises(Exception, match="Segmentation fault"):
+        sprintf(buffer, "%s", "long string")
+    free(buffer)
+
+
+def test_only_the_bytes_up_to_the_nul_count_as_read(uninit_reads):
+    with use_instance(MemoryManager(4096, uninit_fill="zero")):
+        text = char_ptr_t(malloc(100))
+        text[0] = "h"
+        assert to_python_string(text) == "h"
+        assert len(uninit_reads) == 1
+
+        text[1]
+        assert len(uninit_reads) == 1
+        text[60]
+        assert len(uninit_reads) == 2
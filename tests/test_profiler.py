@@ -0,0 +1,60 @@
+import pytest
+
+from mmsimu.all import free, int32_ptr_t, malloc, realloc
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.profiler import CostModel
+
+
+def test_cost_model():
+    costs = CostModel()
+    assert costs.malloc_cycles(64) == 20
+    assert costs.malloc_cycles(65) == 60
+    assert costs.free_cycles(1 << 20) == 1500
+    assert costs.realloc_cycles(100, 200, moved=False) == costs.resize
+    assert costs.realloc_cycles(100, 200, moved=True) == 60 + 40 + 25
+    assert costs.access_cycles(0, 4) == 4
+    assert costs.access_cycles(1, 20) == 12
+
+
+def allocate_and_access():
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    numbers[0]
+    numbers = int32_ptr_t(realloc(numbers, 32))
+    free(numbers)
+
+
+def test_cycles_are_charged_to_call_sites():
+    costs = CostModel(read={4: 100}, write={4: 10})
+    with use_instance(MemoryManager(1024, seed=0)) as mm:
+        profiler = mm.start_profiling(costs)
+        allocate_and_access()
+
+    sites = {
+        profile.site.lineno: profile
+        for profile in profiler.hot_spots()
+        if profile.site.function == "allocate_and_access"
+    }
+    assert len(sites) == 5
+    hottest = profiler.hot_spots()[0]
+    assert hottest.operations == {"read": 1} and hottest.cycles == 100
+    moved = [profile for profile in sites.values() if "realloc" in profile.operations]
+    assert moved[0].bytes_copied == 16
+    assert profiler.total_cycles() == pytest.approx(
+        20 + 10 + 100 + costs.realloc_cycles(16, 32, moved=True) + 15
+    )
+
+
+def test_collapsed_stacks(tmp_path):
+    with use_instance(MemoryManager(1024, seed=0)) as mm:
+        profiler = mm.start_profiling()
+        allocate_and_access()
+
+    path = tmp_path / "profile.folded"
+    profiler.save_collapsed_stacks(path)
+    lines = path.read_text().splitlines()
+    assert len(lines) == len(profiler.sites)
+    stack, cycles = lines[0].rsplit(" ", 1)
+    assert stack.startswith("allocate_and_access:")
+    assert int(cycles) == round(profiler.hot_spots()[0].cycles)
@@ -0,0 +1,29 @@
+import random
+
+from mmsimu.all import free, malloc, realloc
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.replay import load_allocation_ops, replay
+from mmsimu.trace import TraceRecorder
+
+
+def test_replay_matches_the_memory_manager(tmp_path):
+    path = str(tmp_path / "trace")
+    mm = MemoryManager(4096, policy="best-fit")
+    recorder = mm.add_observer(TraceRecorder(path))
+    rng = random.Random(0)
+    with use_instance(mm):
+        blocks = [malloc(rng.randint(1, 64)) for _ in range(20)]
+        for _ in range(200):
+            index = rng.randrange(len(blocks))
+            if rng.random() < 0.3:
+                blocks[index] = realloc(blocks[index], rng.randint(1, 128))
+            else:
+                free(blocks[index])
+                blocks[index] = malloc(rng.randint(1, 64))
+    recorder.close()
+
+    result = replay(load_allocation_ops(path), "best-fit", 4096)
+    assert result["peak_in_use"] == mm.peak_allocated
+    assert result["peak_extent"] == mm.allocator.top
+    assert result["failed_allocations"] == 0
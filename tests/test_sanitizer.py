@@ -0,0 +1,108 @@
+import pytest
+
+from mmsimu.all import (
+    char_ptr_t,
+    free,
+    int32_ptr_t,
+    malloc,
+    realloc,
+    restore,
+    snapshot,
+)
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+from mmsimu.sanitizer import ADDRESSABLE, FREED, REDZONE
+from mmsimu.types.pointer import PointerType
+
+char_ptr_ptr_t = PointerType(char_ptr_t)
+
+
+@pytest.fixture(params=["first-fit", "buddy"])
+def mm(request):
+    manager = MemoryManager(
+        1 << 14, checks="sanitize", quarantine_bytes=256, policy=request.param, seed=0
+    )
+    with use_instance(manager) as mm:
+        yield mm
+
+
+def test_overflow_and_underflow(mm):
+    numbers = int32_ptr_t(malloc(40))
+    with pytest.raises(Exception, match="heap-buffer-overflow.*0 bytes after"):
+        numbers[10] = 1
+    with pytest.raises(Exception, match="heap-buffer-overflow.*4 bytes before"):
+        numbers[-1]
+
+
+def test_use_after_free_through_a_loaded_pointer(mm):
+    block = malloc(16)
+    pointers = char_ptr_ptr_t(malloc(8))
+    pointers[0] = char_ptr_t(block)
+    free(block)
+    with pytest.raises(Exception, match="heap-use-after-free"):
+        pointers[0][0]
+
+
+def test_blocks_leave_the_quarantine_past_its_budget(mm):
+    numbers = int32_ptr_t(malloc(40))
+    free(numbers)
+    assert mm.sanitizer.state(numbers.allocation.offset) == FREED
+    for _ in range(10):
+        free(malloc(40))
+
+    assert mm.sanitizer.quarantined_bytes <= 256
+    entry = mm.sanitizer.quarantined_block(numbers.allocation.offset)
+    assert entry is None or entry[0] is not numbers.allocation
+
+
+def test_restore_brings_back_the_shadow_map(mm):
+    numbers = int32_ptr_t(malloc(16))
+    offset = numbers.allocation.offset
+    numbers[0] = 7
+    saved = snapshot()
+    free(numbers)
+    assert mm.sanitizer.state(offset) == FREED
+
+    restore(saved)
+    assert mm.sanitizer.state(offset) == ADDRESSABLE
+    numbers[0] = 1
+    free(numbers)
+    restore(saved)
+    assert numbers[0] == 7
+
+
+def test_tail_released_by_an_in_place_shrink():
+    manager = MemoryManager(
+        1 << 14, checks="sanitize", realloc_mode="in-place", policy="first-fit"
+    )
+    with use_instance(manager):
+        block = malloc(256)
+        pointers = char_ptr_ptr_t(malloc(8))
+        pointers[0] = char_ptr_t(block) + 200
+        block = realloc(block, 16)
+        assert int(block) == int(pointers[0]) - 200
+
+        with pytest.raises(Exception, match="wild pointer.*outside of any block"):
+            pointers[0][0]
+        with pytest.raises(Exception, match="heap-buffer-overflow.*0 bytes after"):
+            char_ptr_t(block)[16]
+
+
+def test_only_redzones_and_freed_blocks_are_written(mm):
+    block = malloc(100)
+    start = block.offset
+    shadow = mm.heap.shadow
+    # Left as zero, so the shadow pages of the contents are never written
+    assert shadow[start : start + 100].count(0) == 100
+    assert shadow[start - mm.redzone : start] == bytes([REDZONE]) * mm.redzone
+    free(block)
+    assert shadow[start : start + 100] == bytes([FREED]) * 100
+
+
+def test_blocks_larger_than_the_quarantine_skip_it(mm):
+    block = malloc(1000)
+    start = block.offset
+    free(block)
+    assert mm.sanitizer.quarantined_bytes == 0
+    assert mm.heap.shadow[start - mm.redzone : start + 1000].count(0) == 1000 + mm.redzone
+    assert malloc(1000).offset == start
@@ -0,0 +1,74 @@
+import pytest
+
+from mmsimu.all import free, int32_ptr_t, malloc, restore, snapshot
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def mm():
+    with use_instance(MemoryManager(1 << 14, seed=0)) as mm:
+        yield mm
+
+
+def test_restore_brings_back_contents_and_blocks(mm):
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    saved = snapshot()
+    numbers[0] = 2
+    extra = malloc(32)
+    free(numbers)
+
+    restore(saved)
+    assert numbers[0] == 1
+    assert mm.heap_stats()["live_blocks"] == 1
+    with pytest.raises(AssertionError, match="after free"):
+        int32_ptr_t(extra)[0]
+    free(numbers)
+
+
+def test_restore_twice_and_nested(mm):
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    first = snapshot()
+    numbers[0] = 2
+    second = snapshot()
+    numbers[0] = 3
+
+    restore(second)
+    assert numbers[0] == 2
+    numbers[0] = 4
+    restore(second)
+    assert numbers[0] == 2
+    restore(first)
+    assert numbers[0] == 1
+    with pytest.raises(Exception, match="can't be restored"):
+        restore(second)
+
+
+def test_writes_through_a_view_created_before_the_snapshot(mm):
+    pytest.importorskip("numpy")
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    view = numbers.as_array(4)
+    saved = snapshot()
+    view[0] = 99
+
+    restore(saved)
+    assert numbers[0] == 1
+    # The view still writes to the heap, and the snapshot can be reused
+    view[0] = 98
+    restore(saved)
+    assert numbers[0] == 1
+
+
+def test_writes_through_a_view_created_after_the_snapshot(mm):
+    pytest.importorskip("numpy")
+    numbers = int32_ptr_t(malloc(16))
+    numbers[0] = 1
+    saved = snapshot()
+    view = numbers.as_array(4)
+    view[0] = 99
+
+    restore(saved)
+    assert numbers[0] == 1
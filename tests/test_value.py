@@ -0,0 +1,69 @@
+import pytest
+
+from mmsimu.all import char_ptr_t, free, int32_ptr_t, malloc
+from mmsimu.instance import use_instance
+from mmsimu.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def mm():
+    with use_instance(MemoryManager(1 << 14, seed=0)) as mm:
+        yield mm
+
+
+def test_walk_stops_at_the_terminator(mm, uninit_reads):
+    text = char_ptr_t(malloc(100))
+    for i, char in enumerate("hi\0"):
+        text[i] = char
+
+    assert list(text.walk()) == ["h", "i"]
+    assert list((text + 1).walk()) == ["i"]
+    assert not uninit_reads
+    # The bytes after the terminator were not read by the walk
+    text[50]
+    assert len(uninit_reads) == 1
+
+
+def test_walk_reads_garbage_up_to_the_terminator(uninit_reads):
+    with use_instance(MemoryManager(1024, uninit_fill="zero")):
+        text = char_ptr_t(malloc(100))
+        text[0] = "a"
+        assert list(text.walk()) == ["a"]
+        assert [event["size"] for event in uninit_reads] == [2]
+        text[2]
+        assert len(uninit_reads) == 2
+
+
+def test_walk_past_the_end_is_a_segfault(mm):
+    numbers = int32_ptr_t(malloc(16))
+    for i in range(4):
+        numbers[i] = i + 1
+    with pytest.raises(Exception, match="Segmentation fault"):
+        list(numbers.walk())
+    assert list(numbers.walk(until=3)) == [1, 2]
+
+
+def test_iter_yields_until_the_end_of_the_block(mm, uninit_reads):
+    numbers = int32_ptr_t(malloc(2000 * 4))
+    for i in range(2000):
+        numbers[i] = i
+    assert list(numbers) == list(range(2000))
+    assert list(numbers + 1998) == [1998, 1999]
+    assert not uninit_reads
+
+
+def test_iter_after_free(mm):
+    numbers = int32_ptr_t(malloc(16))
+    free(numbers)
+    with pytest.raises(AssertionError, match="after free"):
+        next(iter(numbers))
+
+
+def test_unchecked_walk_keeps_reading_the_heap():
+    manager = MemoryManager(1024, checks="accounting", policy="first-fit", seed=0)
+    with use_instance(manager):
+        first = char_ptr_t(malloc(2))
+        second = char_ptr_t(malloc(2))
+        first[0], first[1] = "a", "b"
+        second[0], second[1] = "c", "\0"
+        assert "".join(first.walk()) == "abc"